@@ -2,6 +2,9 @@ import numpy as np
 import scipy.signal as signal
 from tqdm import tqdm
 
+from .Qualidade import DESCARTE_PADRAO
+from .Leitor_Sinal import antecipar
+
 def filtro_passa_banda(freq_min, freq_max, fs, ordem=5):
     """
     Cria um filtro passa-banda Butterworth.
@@ -41,21 +44,30 @@ def filtro_IIR(sinal, alpha=0.1):
 
 def media_movel(sinal, comprimento):
     """
-    Aplica média móvel simples ao sinal.
+    Aplica média móvel simples ao sinal, ignorando amostras NaN (blocos
+    mascarados): cada ponto é a média só das amostras válidas da janela.
 
     Parâmetros:
         sinal (ndarray): Sinal de entrada.
         comprimento (int): Janela da média móvel.
 
     Retorno:
-        ndarray: Sinal suavizado.
+        ndarray: Sinal suavizado (NaN onde a janela não tem amostra válida).
     """
-    janela = np.ones(comprimento) / comprimento
-    return np.convolve(sinal, janela, mode='same')
+    sinal = np.asarray(sinal, dtype=np.float64)
+    validos = np.isfinite(sinal)
+    janela = np.ones(comprimento)
+    soma = np.convolve(np.where(validos, sinal, 0.0), janela, mode='same')
+    contagem = np.convolve(validos.astype(np.float64), janela, mode='same')
+
+    media = np.full(sinal.shape, np.nan)
+    np.divide(soma, contagem, out=media, where=contagem > 0.5)
+    return media
 
 
 def Amplitude_Direta(Sinal_VLF, Taxa_de_amostragem, Rs, Fc, 
-                     epsilon=1e-12, P_referencia=5e-6, suavizacao=True):
+                     epsilon=1e-12, P_referencia=5e-6, suavizacao=True,
+                     qualidade=None, mascara_descarte=DESCARTE_PADRAO, antecipacao=2):
     """
     Calcula a amplitude RMS em dB de um sinal VLF por blocos, com ou sem suavização.
 
@@ -67,16 +79,27 @@ def Amplitude_Direta(Sinal_VLF, Taxa_de_amostragem, Rs, Fc,
         epsilon (float): Valor mínimo para evitar log de zero.
         P_referencia (float): Potência de referência para dB.
         suavizacao (bool): Aplica ou não média móvel final.
+        qualidade (ndarray): Índice de qualidade por bloco (opcional).
+        mascara_descarte (int): Flags que mascaram o bloco (amplitude NaN).
+        antecipacao (int): Blocos lidos à frente em thread de fundo (0 = síncrono).
 
     Retorno:
         ndarray: Amplitudes em dB (suavizadas ou não).
     """
+    Sinal_VLF = antecipar(Sinal_VLF, antecipacao)
     largura_banda = Rs / 2
+    aquecimento = getattr(Sinal_VLF, "blocos_aquecimento", 0)
     Amp_dB = []
+    flags = qualidade["flags"] if qualidade is not None else np.zeros(0, dtype=np.uint8)
+
+    for k, bloco in enumerate(tqdm(Sinal_VLF, total=Sinal_VLF.total_blocos,
+                                   desc="Medindo Amplitude por blocos", unit="bloco")):
+
+        # Bloco marcado como ruim: mascarado em vez de processado
+        if k < len(flags) and flags[k] & mascara_descarte:
+            Amp_dB.append(np.nan)
+            continue
 
-    for bloco in tqdm(Sinal_VLF, total=Sinal_VLF.total_blocos,
-                      desc="Medindo Amplitude por blocos", unit="bloco"):
-        
         # Definir a faixa do filtro
         freq_min = Fc - largura_banda
         freq_max = Fc + largura_banda
@@ -93,8 +116,10 @@ def Amplitude_Direta(Sinal_VLF, Taxa_de_amostragem, Rs, Fc,
     Amp_dB = np.array(Amp_dB)
 
     if suavizacao:
-        # Aplica média móvel e remove bordas para evitar distorções
+        # Aplica média móvel e remove o fim para evitar distorções. O início
+        # só perde a margem de aquecimento: o primeiro valor continua sendo o
+        # primeiro bloco, como supõe o eixo de tempo do script principal
         Amp_suave = media_movel(Amp_dB, Rs // 2)
-        return Amp_suave[Rs // 2 : -Rs // 4]  # retorno cortado para estabilidade
+        return Amp_suave[aquecimento : -Rs // 4]  # retorno cortado para estabilidade
     else:
-        return Amp_dB
+        return Amp_dB[aquecimento:]
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+Arquivo multidias de amplitude e fase com curvas de dia calmo (QDC)
+
+Cada dia processado é reamostrado para uma grade UT comum e gravado como
+uma linha de um array empilhado mapeado em memória (dias, pontos, 2). A QDC
+de cada dia (mediana e percentis dos dias anteriores) é calculada quando o
+dia chega e gravada ao lado, de modo que "dia X menos QDC" lê só duas
+linhas, sem percorrer o arquivo inteiro.
+"""
+
+import os
+import json
+import warnings
+import numpy as np
+from datetime import datetime
+
+
+FORMATO_DATA = "%d-%m-%Y"
+
+
+class ArquivoMultidias:
+    """
+    Parâmetros:
+        diretorio (str): Pasta do arquivo (uma por estação/frequência).
+        resolucao_s (int): Passo da grade UT (s).
+        janela_dias (int): Dias anteriores usados na QDC.
+        percentis (tuple): Percentis gravados junto com a mediana.
+    """
+
+    def __init__(self, diretorio, resolucao_s=60, janela_dias=15, percentis=(10, 90)):
+        self.diretorio = diretorio
+        os.makedirs(diretorio, exist_ok=True)
+        self.caminho_indice = os.path.join(diretorio, "indice.json")
+
+        if os.path.exists(self.caminho_indice):
+            with open(self.caminho_indice) as f:
+                self.indice = json.load(f)
+        else:
+            self.indice = {
+                "resolucao_s": resolucao_s,
+                "n_pontos": 86400 // resolucao_s,
+                "janela_dias": janela_dias,
+                "percentis": list(percentis),
+                "datas": {},
+            }
+
+        self.n_pontos = self.indice["n_pontos"]
+        self.n_estatisticas = 1 + len(self.indice["percentis"])
+        self._abrir(max(len(self.indice["datas"]), 1))
+
+    # -------------------------------------------------------------------------
+    #  Armazenamento
+    # -------------------------------------------------------------------------
+
+    def _abrir(self, linhas):
+        """Mapeia (e estende, se preciso) os arrays de dados e de QDC."""
+        self.capacidade = linhas
+        self.dados = self._mapear("dados.f4", (linhas, self.n_pontos, 2))
+        self.qdc_dados = self._mapear("qdc.f4", (linhas, self.n_estatisticas, self.n_pontos, 2))
+
+    def _mapear(self, nome, forma):
+        caminho = os.path.join(self.diretorio, nome)
+        tamanho = int(np.prod(forma)) * 4
+        antigo = os.path.getsize(caminho) if os.path.exists(caminho) else 0
+        if antigo < tamanho:
+            with open(caminho, 'ab') as f:
+                f.truncate(tamanho)
+            # Linhas novas começam como NaN (dia/ponto ausente)
+            extensao = np.memmap(caminho, dtype=np.float32, mode='r+',
+                                 offset=antigo, shape=((tamanho - antigo) // 4,))
+            extensao[:] = np.nan
+            extensao.flush()
+        return np.memmap(caminho, dtype=np.float32, mode='r+', shape=forma)
+
+    def _linha(self, data):
+        datas = self.indice["datas"]
+        if data not in datas:
+            datas[data] = len(datas)
+            if datas[data] >= self.capacidade:
+                self._abrir(max(2 * self.capacidade, datas[data] + 1))
+        return datas[data]
+
+    def _salvar_indice(self):
+        temporario = self.caminho_indice + ".tmp"
+        with open(temporario, 'w') as f:
+            json.dump(self.indice, f, indent=1)
+        os.replace(temporario, self.caminho_indice)
+
+    # -------------------------------------------------------------------------
+    #  Grade UT
+    # -------------------------------------------------------------------------
+
+    @property
+    def tempo_UT(self):
+        """Horas UT de cada ponto da grade."""
+        return np.arange(self.n_pontos) * self.indice["resolucao_s"] / 3600
+
+    def _na_grade(self, tempo_UT, valores):
+        """Média por ponto da grade (horas tomadas módulo 24); sem dados = NaN."""
+        tempo_UT = np.asarray(tempo_UT, dtype=np.float64)
+        valores = np.asarray(valores, dtype=np.float64)
+        validos = np.isfinite(valores)
+
+        segundos = np.round((tempo_UT[validos] % 24) * 3600, 6)  # evita erro de ponto flutuante
+        pontos = (segundos // self.indice["resolucao_s"]).astype(np.int64)
+        pontos = np.minimum(pontos, self.n_pontos - 1)
+        soma = np.bincount(pontos, weights=valores[validos], minlength=self.n_pontos)
+        contagem = np.bincount(pontos, minlength=self.n_pontos)
+
+        grade = np.full(self.n_pontos, np.nan)
+        np.divide(soma, contagem, out=grade, where=contagem > 0)
+        return grade
+
+    def _cobertura(self, tempo_UT):
+        """Pontos da grade inteiramente cobertos pelo trecho processado."""
+        tempo_UT = np.asarray(tempo_UT, dtype=np.float64)
+        if tempo_UT.size == 0:
+            return np.zeros(0, dtype=np.int64)
+        passo = np.median(np.diff(tempo_UT)) if tempo_UT.size > 1 else 0.0
+        resolucao = self.indice["resolucao_s"]
+        inicio = np.ceil(np.round(tempo_UT[0] * 3600 / resolucao, 6))
+        fim = np.floor(np.round((tempo_UT[-1] + passo) * 3600 / resolucao, 6))
+        pontos = np.arange(inicio, fim, dtype=np.int64)[:self.n_pontos]
+        return pontos % self.n_pontos
+
+    # -------------------------------------------------------------------------
+    #  Entrada de dias e QDC
+    # -------------------------------------------------------------------------
+
+    def datas_ordenadas(self):
+        return sorted(self.indice["datas"], key=lambda d: datetime.strptime(d, FORMATO_DATA))
+
+    def adicionar_dia(self, data, tempo_UT_amp, amplitude_db, tempo_UT_fase, fase, parcial=False):
+        """
+        Grava (ou substitui) o dia 'data' ("DD-MM-AAAA") e atualiza a QDC
+        dele e dos dias seguintes cuja janela o inclui.
+
+        Com 'parcial' (processamento de uma janela UT), só os pontos da grade
+        cobertos pela janela são substituídos; o resto do dia é mantido.
+        """
+        linha = self._linha(data)
+        for coluna, (tempo_UT, valores) in enumerate(((tempo_UT_amp, amplitude_db),
+                                                      (tempo_UT_fase, fase))):
+            grade = self._na_grade(tempo_UT, valores)
+            if parcial:
+                pontos = self._cobertura(tempo_UT)
+                self.dados[linha, pontos, coluna] = grade[pontos]
+            else:
+                self.dados[linha, :, coluna] = grade
+        self.dados.flush()
+
+        datas = self.datas_ordenadas()
+        posicao = datas.index(data)
+        for afetada in datas[posicao:posicao + self.indice["janela_dias"] + 1]:
+            self._calcular_qdc(afetada, datas)
+
+        self.qdc_dados.flush()
+        self._salvar_indice()
+
+    def _calcular_qdc(self, data, datas):
+        """QDC de 'data' a partir dos 'janela_dias' dias anteriores do arquivo."""
+        posicao = datas.index(data)
+        anteriores = datas[max(0, posicao - self.indice["janela_dias"]):posicao]
+        destino = self.qdc_dados[self.indice["datas"][data]]
+
+        if not anteriores:
+            destino[:] = np.nan
+            return
+
+        linhas = sorted(self.indice["datas"][d] for d in anteriores)
+        pilha = self.dados[linhas]  # lê apenas as linhas da janela
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # pontos sem nenhum dia
+            destino[0] = np.nanmedian(pilha, axis=0)
+            if self.indice["percentis"]:
+                destino[1:] = np.nanpercentile(pilha, self.indice["percentis"], axis=0)
+
+    # -------------------------------------------------------------------------
+    #  Consultas
+    # -------------------------------------------------------------------------
+
+    def dia(self, data):
+        """(amplitude, fase) do dia na grade UT."""
+        linha = self.indice["datas"][data]
+        return self.dados[linha, :, 0], self.dados[linha, :, 1]
+
+    def qdc(self, data):
+        """Curvas de dia calmo de 'data': {'mediana': (n, 2), 'p10': ..., ...}."""
+        curvas = self.qdc_dados[self.indice["datas"][data]]
+        resultado = {"mediana": curvas[0]}
+        for k, p in enumerate(self.indice["percentis"]):
+            resultado[f"p{p:g}"] = curvas[k + 1]
+        return resultado
+
+    def diferenca_qdc(self, data):
+        """(amplitude - QDC, fase - QDC) do dia, lendo só o dia e a sua QDC."""
+        linha = self.indice["datas"][data]
+        diferenca = self.dados[linha] - self.qdc_dados[linha, 0]
+        return diferenca[:, 0], diferenca[:, 1]
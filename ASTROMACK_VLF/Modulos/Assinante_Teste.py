@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""
+Assinante de teste do publicador de produtos
+
+Conecta ao PublicadorProdutos e imprime cada registro recebido. Uso, a
+partir da pasta ASTROMACK_VLF, com o processamento rodando:
+
+    python -m Modulos.Assinante_Teste                  # TCP 127.0.0.1:5760
+    python -m Modulos.Assinante_Teste 127.0.0.1:5761   # outra porta
+    python -m Modulos.Assinante_Teste /tmp/astromack.sock
+"""
+
+import sys
+import numpy as np
+
+from .Publicador import assinar
+
+
+def interpretar_endereco(texto):
+    """'host:porta' -> TCP; qualquer outro texto -> caminho de socket Unix."""
+    host, _, porta = texto.rpartition(":")
+    if host and porta.isdigit():
+        return host, int(porta)
+    return texto
+
+
+def main(endereco=("127.0.0.1", 5760)):
+    total = 0
+    for r in assinar(endereco):
+        total += 1
+        fase_media = np.mean(r.fase) if len(r.fase) else np.nan
+        print(f"[ASSINANTE] {r.tempo_UT:9.5f} h UT | amplitude {r.amplitude_db:9.4f} dB | "
+              f"fase média {fase_media:10.4f}° ({len(r.fase)} amostras) | flags {r.flags}")
+    print(f"[ASSINANTE] Conexão encerrada após {total} registros")
+
+
+if __name__ == "__main__":
+    main(interpretar_endereco(sys.argv[1]) if len(sys.argv) > 1 else ("127.0.0.1", 5760))
@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+"""
+Arquivo intermediário em banda base complexa (IQ decimado) por portadora
+
+A captura de 96 kHz é convertida uma única vez para a banda base complexa
+em torno de cada Fc e decimada (80x por padrão -> 1200 amostras/s), e
+gravada como complex64 mapeado em memória com um sidecar JSON. O arquivo
+tem ~1/40 do tamanho da captura em float32 (8 bytes a cada 80 amostras
+de 4 bytes) e os demoduladores em banda base rodam sobre ele sem reler
+nem refiltrar a captura.
+
+Convenção: para x(t) = Re{z(t) e^(j 2pi Fc t)}, o arquivo guarda
+y = passa-baixa{x e^(-j 2pi Fc t)} = z / 2, com t absoluto desde o início
+da captura.
+"""
+
+import os
+import json
+import numpy as np
+import scipy.signal as signal
+from tqdm import tqdm
+
+from .Demodulador_MSK2 import filtro_passa_baixa, integrar_canal, decodificar_simbolos
+
+
+VERSAO_FORMATO = 1
+
+
+# -----------------------------------------------------------------------------
+#  ARQUIVOS
+# -----------------------------------------------------------------------------
+
+def caminho_banda_base(caminho_captura, Fc, decimacao=80, canal=0):
+    """Arquivo IQ gravado ao lado da captura (um por Fc, decimação e canal)."""
+    sufixo = f".canal{canal}" if canal else ""
+    return caminho_captura + f"{sufixo}.bb{Fc:g}_d{decimacao}.iq"
+
+
+def ler_metadados(caminho_iq):
+    with open(caminho_iq + ".json") as f:
+        return json.load(f)
+
+
+# -----------------------------------------------------------------------------
+#  CONVERSÃO PARA BANDA BASE (UMA PASSAGEM, VÁRIAS PORTADORAS)
+# -----------------------------------------------------------------------------
+
+class ConversorBandaBase:
+    """
+    Mistura com e^(-j 2pi Fc t) e decima com um FIR passa-baixa de fase
+    linear em forma polifásica (upfirdn: só as saídas mantidas são
+    calculadas). O estado entre blocos são as últimas amostras misturadas,
+    de modo que a saída é contínua e centrada (atraso do FIR compensado).
+
+    Parâmetros:
+        Fs (int): Taxa de amostragem da captura (Hz).
+        Fc (float): Portadora (Hz).
+        decimacao (int): Fator de decimação D.
+        corte (float): Corte do passa-baixa (Hz); padrão 0,42 * Fs/D.
+        semi_comprimento (int): Meio comprimento do FIR em múltiplos de D.
+    """
+
+    def __init__(self, Fs, Fc, decimacao=80, corte=None, semi_comprimento=8):
+        self.Fs = Fs
+        self.Fc = Fc
+        self.decimacao = D = decimacao
+        self.Fs_bb = Fs / D
+        self.corte = corte if corte else 0.42 * self.Fs_bb
+
+        # Atraso (L-1)/2 múltiplo de D: as saídas caem em amostras n = m*D
+        self.atraso = semi_comprimento * D
+        self.h = signal.firwin(2 * self.atraso + 1, self.corte, fs=Fs)
+
+        self.amostra = 0                                    # Próxima amostra de entrada
+        self.resto = np.zeros(self.atraso, np.complex128)   # Zeros antes do início
+        self.inicio_resto = -self.atraso
+
+    def _misturar(self, bloco):
+        n = self.amostra + np.arange(len(bloco), dtype=np.int64)
+        if float(self.Fc).is_integer() and float(self.Fs).is_integer():
+            # Fase exata por aritmética inteira (sem perda de precisão em 24 h)
+            fase = 2 * np.pi * ((int(self.Fc) * n) % int(self.Fs)) / self.Fs
+        else:
+            fase = 2 * np.pi * self.Fc * (n / self.Fs)
+        return bloco * np.exp(-1j * fase)
+
+    def processar(self, bloco, final=False):
+        """Retorna as amostras decimadas prontas (complex128)."""
+        bloco = np.nan_to_num(np.asarray(bloco, dtype=np.float64), nan=0.0)
+        misturado = self._misturar(bloco)
+        self.amostra += len(bloco)
+
+        D, L = self.decimacao, len(self.h)
+        buffer = np.concatenate((self.resto, misturado))
+        if final:
+            buffer = np.concatenate((buffer, np.zeros(self.atraso)))
+
+        # y[j] = sum_k h[k] buffer[j*D - k]; válido com suporte inteiro no buffer
+        y = signal.upfirdn(self.h, buffer, up=1, down=D)
+        j_inicio = (L - 1 + D - 1) // D
+        j_fim = (len(buffer) - 1) // D + 1
+        saida = y[j_inicio:j_fim]
+
+        if final:
+            # Só as saídas cujo instante está dentro da captura
+            tempos = self.inicio_resto + np.arange(j_inicio, j_fim) * D - self.atraso
+            saida = saida[tempos < self.amostra]
+
+        # Próxima saída: instante t = inicio_resto + j_fim*D - atraso, que
+        # precisa das entradas a partir de t - atraso
+        proximo = max(self.inicio_resto + j_fim * D - 2 * self.atraso, self.inicio_resto)
+        self.resto = buffer[proximo - self.inicio_resto:]
+        self.inicio_resto = proximo
+        return saida
+
+
+def gerar_banda_base(Sinal_VLF, Fcs, decimacao=80):
+    """
+    Converte a captura inteira para banda base em torno de cada Fc numa
+    única leitura.
+
+    Parâmetros:
+        Sinal_VLF: leitor da captura inteira (LeitorSinalVLF).
+        Fcs: lista de portadoras (Hz).
+        decimacao (int): Fator de decimação.
+
+    Retorno:
+        dicionário {Fc: caminho do arquivo IQ}
+    """
+    conversores = {Fc: ConversorBandaBase(Sinal_VLF.Fs, Fc, decimacao) for Fc in Fcs}
+    caminhos = {Fc: caminho_banda_base(Sinal_VLF.caminho, Fc, decimacao, Sinal_VLF.indice_canal)
+                for Fc in Fcs}
+    arquivos = {Fc: open(caminhos[Fc] + ".tmp", 'wb') for Fc in Fcs}
+
+    try:
+        total = Sinal_VLF.total_blocos
+        for k, bloco in enumerate(tqdm(Sinal_VLF, total=total, desc="Banda base", unit="bloco")):
+            for Fc, conversor in conversores.items():
+                saida = conversor.processar(bloco, final=(k == total - 1))
+                arquivos[Fc].write(saida.astype(np.complex64).tobytes())
+    finally:
+        for f in arquivos.values():
+            f.close()
+
+    for Fc, conversor in conversores.items():
+        metadados = {
+            "versao": VERSAO_FORMATO,
+            "captura": os.path.basename(Sinal_VLF.caminho),
+            "canal": Sinal_VLF.indice_canal,
+            "Fs_original": Sinal_VLF.Fs,
+            "Fc": Fc,
+            "decimacao": decimacao,
+            "Fs": conversor.Fs_bb,
+            "corte": conversor.corte,
+            "taps": len(conversor.h),
+            "amostras": os.path.getsize(caminhos[Fc] + ".tmp") // 8,
+        }
+        os.replace(caminhos[Fc] + ".tmp", caminhos[Fc])
+        with open(caminhos[Fc] + ".json", 'w') as f:
+            json.dump(metadados, f, indent=1)
+        print(f"[BANDA BASE] {metadados['amostras']:,} amostras IQ em {caminhos[Fc]}")
+
+    return caminhos
+
+
+def garantir_banda_base(Sinal_VLF, Fc, decimacao=80):
+    """
+    Caminho do arquivo IQ de Fc, gerando-o se não existir, se a captura for
+    mais nova ou se os parâmetros não baterem.
+    """
+    caminho = caminho_banda_base(Sinal_VLF.caminho, Fc, decimacao, Sinal_VLF.indice_canal)
+    if os.path.exists(caminho) and os.path.exists(caminho + ".json") \
+            and os.path.getmtime(caminho) >= os.path.getmtime(Sinal_VLF.caminho):
+        metadados = ler_metadados(caminho)
+        if (metadados.get("versao") == VERSAO_FORMATO and metadados["Fs_original"] == Sinal_VLF.Fs
+                and metadados["amostras"] * decimacao >= Sinal_VLF.total_amostras - decimacao):
+            return caminho
+    return gerar_banda_base(Sinal_VLF, [Fc], decimacao)[Fc]
+
+
+# -----------------------------------------------------------------------------
+#  LEITOR DO ARQUIVO IQ
+# -----------------------------------------------------------------------------
+
+class LeitorBandaBase:
+    """
+    Leitor por blocos (1 s) do arquivo IQ, com a mesma interface de janela
+    do LeitorSinalVLF (bloco_inicial, total_blocos, blocos_aquecimento).
+
+    Parâmetros:
+        caminho (str): Arquivo .iq (o sidecar .json fica ao lado).
+        tamanho_bloco (int): Amostras IQ por bloco (padrão: 1 segundo).
+    """
+
+    banda_base = True
+
+    def __init__(self, caminho, tamanho_bloco=None, bloco_inicial=0, total_blocos=None,
+                 blocos_aquecimento=0):
+        self.caminho = caminho
+        self.metadados = ler_metadados(caminho)
+        self.Fs = self.metadados["Fs"]
+        self.Fc = self.metadados["Fc"]
+        self.decimacao = self.metadados["decimacao"]
+        self.indice_canal = self.metadados["canal"]
+
+        self.dados = np.memmap(caminho, dtype=np.complex64, mode='r')
+        self.total_amostras = len(self.dados)
+        self.tamanho_bloco = tamanho_bloco if tamanho_bloco else int(round(self.Fs))
+        self.blocos_arquivo = self.total_amostras // self.tamanho_bloco
+
+        self.bloco_inicial = min(bloco_inicial, self.blocos_arquivo)
+        disponiveis = self.blocos_arquivo - self.bloco_inicial
+        self.total_blocos = disponiveis if total_blocos is None else min(total_blocos, disponiveis)
+        self.blocos_aquecimento = min(blocos_aquecimento, self.total_blocos)
+
+    def __iter__(self):
+        return self.gerador_blocos()
+
+    def gerador_blocos(self):
+        for k in range(self.bloco_inicial, self.bloco_inicial + self.total_blocos):
+            yield self.dados[k * self.tamanho_bloco:(k + 1) * self.tamanho_bloco]
+
+
+# -----------------------------------------------------------------------------
+#  DEMODULADOR MSK EM BANDA BASE
+# -----------------------------------------------------------------------------
+
+def demodular_MSK_banda_base(bloco_iq, sinal_CGPS, Fs, Rs, GPS=False, extrair_ascii=False, Teste=0):
+    """
+    Equivalente de demodular_MSK2 sobre o bloco IQ decimado. Com y = z/2,
+    a mistura com as portadoras seguida do passa-baixa vira:
+        I = msk_cos * Re(y) / A        Q = msk_sin * Im(y) / A
+    (a correção de GPS gira y por e^(-j fase) e desloca a envoltória).
+    Teste 2 e 3 usam |portadora|, que não tem equivalente em banda base.
+
+    Parâmetros:
+        bloco_iq: amostras complexas do bloco.
+        sinal_CGPS: correção de fase do GPS (rad) já na taxa da banda base.
+        Fs: taxa da banda base (Hz).
+
+    Retorno:
+        O mesmo de demodular_MSK2.
+    """
+    if Teste not in (0, 1):
+        raise ValueError("Teste 2 e 3 usam |portadora| e não têm equivalente em banda base")
+
+    Rb = Rs * 2
+    N_bit = int(round(Fs / Rb))
+    y = np.asarray(bloco_iq, dtype=np.complex128)
+    t = np.arange(len(y)) / Fs
+
+    fase = 0
+    if GPS:
+        fase = np.asarray(sinal_CGPS)
+        y = y * np.exp(-1j * fase)
+
+    # Envoltórias MSK como em gerar_portadora_MSK_base
+    A = np.sqrt(1 / (2 * (1 / (2 * Rs)))) / 4
+    argumento_MSK = 2 * np.pi * (Rs / 2) * t + fase
+    msk_cos = np.cos(argumento_MSK)
+    msk_sin = np.sin(argumento_MSK)
+    if Teste == 1:
+        msk_cos = np.abs(msk_cos)
+        msk_sin = np.abs(msk_sin)
+
+    sinal_I = msk_cos * y.real / A
+    sinal_Q = msk_sin * y.imag / A
+
+    b_lp, a_lp = filtro_passa_baixa(Rs, Fs)
+    I_filtrado = 2 * signal.filtfilt(b_lp, a_lp, sinal_I)
+    Q_filtrado = 2 * signal.filtfilt(b_lp, a_lp, sinal_Q)
+
+    simbolos_I = integrar_canal(I_filtrado, N_bit, start=0)
+    simbolos_Q = integrar_canal(Q_filtrado, N_bit, start=1)
+
+    return decodificar_simbolos(simbolos_I, simbolos_Q, extrair_ascii=extrair_ascii)
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+Cache endereçado por conteúdo das saídas intermediárias do ASTROMACK
+
+Cada estágio (demodulação, amplitude direta, ...) é identificado por um hash
+da identidade da captura, dos parâmetros do estágio e da versão do código
+que o calcula. Mudar apenas um parâmetro de pós-processamento reaproveita a
+demodulação já feita; mudar a captura, Fs/Fc/Rs/Teste ou o código a refaz.
+As entradas mais antigas são descartadas (LRU) quando o orçamento de disco
+é ultrapassado.
+"""
+
+import os
+import json
+import hashlib
+import numpy as np
+
+
+# -----------------------------------------------------------------------------
+#  IDENTIDADES E CHAVES
+# -----------------------------------------------------------------------------
+
+def identidade_captura(caminho, checksum=None, bytes_checksum=16 * 2**20):
+    """
+    Identidade de um arquivo de captura: tamanho e data de modificação e,
+    opcionalmente, um checksum.
+
+    Parâmetros:
+        checksum (str): None, "parcial" (início e fim do arquivo, barato) ou
+                        "completo" (arquivo inteiro).
+        bytes_checksum (int): Bytes lidos em cada ponta no modo "parcial".
+    """
+    estado = os.stat(caminho)
+    identidade = {
+        "arquivo": os.path.basename(caminho),
+        "tamanho": estado.st_size,
+        "mtime_ns": estado.st_mtime_ns,
+    }
+
+    if checksum:
+        h = hashlib.sha256()
+        with open(caminho, 'rb') as f:
+            if checksum == "completo":
+                for pedaco in iter(lambda: f.read(2**24), b''):
+                    h.update(pedaco)
+            else:
+                h.update(f.read(bytes_checksum))
+                f.seek(max(estado.st_size - bytes_checksum, 0))
+                h.update(f.read(bytes_checksum))
+        identidade["sha256"] = h.hexdigest()
+
+    return identidade
+
+
+def versao_codigo(*modulos):
+    """
+    Hash do código-fonte dos módulos que calculam o estágio. Qualquer edição
+    nesses arquivos invalida as entradas antigas.
+    """
+    h = hashlib.sha256()
+    for modulo in modulos:
+        with open(modulo.__file__, 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()[:16]
+
+
+def chave_estagio(estagio, **entradas):
+    """
+    Chave do estágio: hash do nome e das entradas (parâmetros, identidades,
+    chaves de estágios anteriores). Arrays entram pelo hash do conteúdo.
+    """
+    def normalizar(valor):
+        if isinstance(valor, np.ndarray):
+            return hashlib.sha256(np.ascontiguousarray(valor).tobytes()).hexdigest()
+        if isinstance(valor, np.generic):
+            return valor.item()
+        return str(valor)
+
+    texto = json.dumps({"estagio": estagio, **entradas}, sort_keys=True, default=normalizar)
+    return f"{estagio}-{hashlib.sha256(texto.encode()).hexdigest()[:24]}"
+
+
+# -----------------------------------------------------------------------------
+#  CACHE EM DISCO COM DESCARTE LRU
+# -----------------------------------------------------------------------------
+
+class CacheEstagios:
+    """
+    Guarda as saídas de cada estágio como .npz em 'diretorio'. A data de
+    modificação do arquivo marca o último uso (LRU).
+
+    Parâmetros:
+        diretorio (str): Pasta do cache.
+        orcamento_bytes (float): Tamanho máximo do cache em disco.
+    """
+
+    def __init__(self, diretorio, orcamento_bytes=20e9):
+        self.diretorio = diretorio
+        self.orcamento_bytes = orcamento_bytes
+        os.makedirs(diretorio, exist_ok=True)
+
+    def _caminho(self, chave):
+        return os.path.join(self.diretorio, chave + ".npz")
+
+    def obter(self, chave):
+        """Retorna o dicionário de arrays do estágio ou None."""
+        caminho = self._caminho(chave)
+        if not os.path.exists(caminho):
+            return None
+
+        os.utime(caminho)  # marca o uso para o LRU
+        with np.load(caminho, allow_pickle=False) as dados:
+            return {nome: dados[nome] for nome in dados.files}
+
+    def guardar(self, chave, **arrays):
+        """Grava as saídas do estágio e aplica o orçamento de disco."""
+        caminho = self._caminho(chave)
+        temporario = caminho + ".tmp.npz"
+        np.savez(temporario, **arrays)
+        os.replace(temporario, caminho)  # gravação atômica
+        self._despejar()
+
+    def _despejar(self):
+        entradas = []
+        for nome in os.listdir(self.diretorio):
+            if nome.endswith(".npz") and not nome.endswith(".tmp.npz"):
+                caminho = os.path.join(self.diretorio, nome)
+                estado = os.stat(caminho)
+                entradas.append((estado.st_mtime, estado.st_size, caminho))
+
+        total = sum(tamanho for _, tamanho, _ in entradas)
+        for _, tamanho, caminho in sorted(entradas):
+            if total <= self.orcamento_bytes:
+                break
+            os.remove(caminho)
+            total -= tamanho
+            print(f"[CACHE] Removido (LRU): {os.path.basename(caminho)}")
+
+
+def em_cache(cache, chave, calcular):
+    """
+    Retorna as saídas do estágio do cache ou as calcula com calcular() (que
+    deve retornar um dicionário de arrays) e as grava.
+    """
+    if cache is not None:
+        dados = cache.obter(chave)
+        if dados is not None:
+            print(f"[CACHE] Reaproveitado: {chave}")
+            return dados
+
+    dados = calcular()
+    if cache is not None:
+        cache.guardar(chave, **dados)
+    return dados
+
+
+# -----------------------------------------------------------------------------
+#  GRAVAÇÃO/REPRODUÇÃO DOS BLOCOS DEMODULADOS
+# -----------------------------------------------------------------------------
+
+class GravadorBlocos:
+    """
+    Receptor no lugar de ProdutosOnline em main_DMSK: guarda a saída de cada
+    bloco (fase esperada, amplitude, flags) e repassa ao receptor interno.
+    O conteúdo gravado permite refazer só o pós-processamento com
+    reproduzir_blocos, sem demodular de novo.
+    """
+
+    def __init__(self, produtos=None):
+        self.produtos = produtos
+        self.fases = []
+        self.amplitudes = []
+        self.flags = []
+
+    def adicionar_bloco(self, fase_esperada, amplitude, flags=0):
+        self.fases.append(np.asarray(fase_esperada, dtype=np.float64))
+        self.amplitudes.append(np.asarray(amplitude, dtype=np.float64))
+        self.flags.append(int(flags))
+        if self.produtos is not None:
+            return self.produtos.adicionar_bloco(fase_esperada, amplitude, flags)
+        return None
+
+    def finalizar(self):
+        if self.produtos is not None:
+            return self.produtos.finalizar()
+        return None
+
+    def arrays(self):
+        """Conteúdo gravado em forma de arrays (para o cache)."""
+        vazio = np.zeros(0)
+        return {
+            "fase_blocos": np.concatenate(self.fases) if self.fases else vazio,
+            "amp_blocos": np.concatenate(self.amplitudes) if self.amplitudes else vazio,
+            "n_fase": np.array([len(f) for f in self.fases], dtype=np.int64),
+            "n_amp": np.array([len(a) for a in self.amplitudes], dtype=np.int64),
+            "flags_blocos": np.array(self.flags, dtype=np.uint8),
+        }
+
+
+def reproduzir_blocos(dados, produtos):
+    """Alimenta 'produtos' com os blocos gravados por GravadorBlocos."""
+    fim_fase = np.cumsum(dados["n_fase"])
+    fim_amp = np.cumsum(dados["n_amp"])
+    for k in range(len(dados["n_fase"])):
+        produtos.adicionar_bloco(
+            dados["fase_blocos"][fim_fase[k] - dados["n_fase"][k]:fim_fase[k]],
+            dados["amp_blocos"][fim_amp[k] - dados["n_amp"][k]:fim_amp[k]],
+            dados["flags_blocos"][k]
+        )
+    produtos.finalizar()
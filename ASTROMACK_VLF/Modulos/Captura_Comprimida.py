@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+Conversão de capturas para o contêiner comprimido .vlfz
+
+Um dia de captura em float32 ocupa ~33 GB. O contêiner guarda a captura
+em chunks de duração fixa (1 minuto por padrão), cada um comprimido de
+forma independente e localizado por um índice de offsets no fim do
+arquivo, de modo que o leitor (Leitor_Sinal.FormatoComprimido) vai direto
+a qualquer bloco e descomprime vários chunks em paralelo.
+
+Antes da compressão as amostras de cada chunk passam por:
+    - quantização int16 quando ela é exata (captura de uma placa de 16
+      bits: amostras múltiplas de 1/32768); senão o chunk fica em float32;
+    - delta ao longo do tempo (só int16; em inteiros o inverso é exato);
+    - embaralhamento de bytes (todos os 1ºs bytes, depois os 2ºs, ...).
+
+Uso, a partir da pasta ASTROMACK_VLF:
+
+    python -m Modulos.Captura_Comprimida "Capturas/.../Captura.mat"
+    python -m Modulos.Captura_Comprimida origem.mat destino.vlfz --compressor lzma
+    python -m Modulos.Captura_Comprimida --help
+"""
+
+import os
+import json
+import lzma
+import zlib
+import argparse
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+from .Leitor_Sinal import (abrir_formato, MAGIA_VLFZ, VERSAO_VLFZ, CABECALHO_VLFZ,
+                           RODAPE_VLFZ, DTYPE_INDICE_VLFZ, CHUNK_INT16, CHUNK_FLOAT32,
+                           TIPOS_CHUNK_VLFZ)
+
+
+def aplicar_filtros(x, filtros):
+    """Delta e embaralhamento de bytes de um chunk (quadros, canais)."""
+    if "delta" in filtros:
+        x = np.diff(x, axis=0, prepend=np.zeros((1, x.shape[1]), dtype=x.dtype))
+    if "shuffle" in filtros:
+        return np.ascontiguousarray(x).view(np.uint8).reshape(-1, x.dtype.itemsize).T.tobytes()
+    return np.ascontiguousarray(x).tobytes()
+
+
+def comprimir_captura(caminho_origem, caminho_destino=None, Fs=96000, formato="auto", canais=1,
+                      segundos_por_chunk=60, compressor="zlib", nivel=6, quantizacao="auto",
+                      threads=None):
+    """
+    Grava a captura no contêiner .vlfz.
+
+    Parâmetros:
+        caminho_origem (str): Captura original (qualquer formato de abrir_formato).
+        caminho_destino (str): Arquivo .vlfz (padrão: origem com extensão .vlfz).
+        Fs (int): Taxa de amostragem, usada quando a origem não tem cabeçalho.
+        formato, canais: Como em Leitor_Sinal.abrir_formato.
+        segundos_por_chunk (float): Duração de cada chunk.
+        compressor (str): "zlib" (rápido) ou "lzma" (menor, mais lento).
+        nivel (int): Nível de compressão.
+        quantizacao (str): "auto" (int16 nos chunks em que é exata, float32
+                           nos demais; sempre sem perda), "float32" ou
+                           "int16" (força int16, COM PERDA em capturas que
+                           não são de 16 bits).
+        threads (int): Chunks comprimidos em paralelo.
+
+    Retorno:
+        caminho_destino
+    """
+    if compressor not in ("zlib", "lzma"):
+        raise ValueError(f"Compressor desconhecido: {compressor}")
+    if quantizacao not in ("auto", "int16", "float32"):
+        raise ValueError(f"Quantização desconhecida: {quantizacao}")
+    if caminho_destino is None:
+        caminho_destino = os.path.splitext(caminho_origem)[0] + ".vlfz"
+
+    origem = abrir_formato(caminho_origem, formato, canais)
+    Fs = origem.Fs or Fs
+    amostras_chunk = int(round(segundos_por_chunk * Fs))
+    n_chunks = -(-origem.total_amostras // amostras_chunk)
+    comprimir = ((lambda b: lzma.compress(b, preset=nivel)) if compressor == "lzma"
+                 else (lambda b: zlib.compress(b, nivel)))
+
+    cabecalho = json.dumps({
+        "Fs": Fs,
+        "canais": origem.canais,
+        "total_amostras": origem.total_amostras,
+        "amostras_por_chunk": amostras_chunk,
+        "chunks": n_chunks,
+        "compressor": compressor,
+        "nivel": nivel,
+        "quantizacao": quantizacao,
+        "origem": os.path.basename(caminho_origem),
+    }).encode()
+
+    def preparar(c):
+        inicio = c * amostras_chunk
+        x = np.stack([origem.ler(inicio, amostras_chunk, canal) for canal in range(origem.canais)],
+                     axis=1)
+        tipo, erro = CHUNK_FLOAT32, 0.0
+        if quantizacao != "float32":
+            escala = TIPOS_CHUNK_VLFZ[CHUNK_INT16][2]
+            q = np.clip(np.round(x / escala), -32768, 32767).astype(np.int16)
+            erro = float(np.max(np.abs(q * np.float32(escala) - x), initial=0.0))
+            if erro == 0.0 or quantizacao == "int16":
+                tipo, x = CHUNK_INT16, q
+            else:
+                erro = 0.0  # chunk gravado em float32, sem perda
+        dtype, filtros, _ = TIPOS_CHUNK_VLFZ[tipo]
+        return comprimir(aplicar_filtros(x.astype(dtype, copy=False), filtros)), tipo, erro
+
+    threads = threads or os.cpu_count() or 1
+    indice = np.zeros(n_chunks, dtype=DTYPE_INDICE_VLFZ)
+    erro_maximo = 0.0
+
+    with open(caminho_destino, 'wb') as f, ThreadPoolExecutor(max_workers=threads) as pool:
+        f.write(CABECALHO_VLFZ.pack(MAGIA_VLFZ, VERSAO_VLFZ, len(cabecalho)))
+        f.write(cabecalho)
+
+        # Janela limitada de chunks em voo, gravados na ordem
+        pendentes = {}
+        proximo = 0
+        for c in range(n_chunks):
+            while proximo < n_chunks and proximo < c + 2 * threads:
+                pendentes[proximo] = pool.submit(preparar, proximo)
+                proximo += 1
+            dados, tipo, erro = pendentes.pop(c).result()
+            erro_maximo = max(erro_maximo, erro)
+            indice[c] = (f.tell(), len(dados), tipo)
+            f.write(dados)
+            print(f"\r[COMPRESSÃO] chunk {c + 1}/{n_chunks}", end="", flush=True)
+
+        offset_indice = f.tell()
+        f.write(indice.tobytes())
+        f.write(RODAPE_VLFZ.pack(offset_indice, MAGIA_VLFZ))
+
+    tamanho_origem = origem.total_amostras * origem.canais * 4
+    tamanho_destino = os.path.getsize(caminho_destino)
+    em_int16 = np.count_nonzero(indice["tipo"] == CHUNK_INT16)
+    print(f"\n[COMPRESSÃO] {caminho_destino}: {tamanho_destino / 1e6:.1f} MB "
+          f"(razão {tamanho_origem / tamanho_destino:.2f}x sobre float32; "
+          f"{em_int16} de {n_chunks} chunks em int16)")
+    if erro_maximo > 0:
+        print(f"[AVISO] quantizacao='int16' forçada com perda (erro máximo {erro_maximo:.3g}); "
+              f"não apague a captura original")
+    return caminho_destino
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m Modulos.Captura_Comprimida",
+        description="Converte uma captura para o contêiner comprimido .vlfz (sem perda por padrão).")
+    parser.add_argument("origem", help="captura original (.mat/.bin float32, int16 bruto, .wav)")
+    parser.add_argument("destino", nargs="?", default=None,
+                        help="arquivo .vlfz (padrão: origem com extensão .vlfz)")
+    parser.add_argument("--Fs", type=int, default=96000,
+                        help="taxa de amostragem de capturas sem cabeçalho (Hz)")
+    parser.add_argument("--formato", default="auto", choices=("auto", "float32", "int16", "wav"))
+    parser.add_argument("--canais", type=int, default=1, help="canais intercalados (capturas brutas)")
+    parser.add_argument("--segundos-por-chunk", type=float, default=60)
+    parser.add_argument("--compressor", default="zlib", choices=("zlib", "lzma"))
+    parser.add_argument("--nivel", type=int, default=6)
+    parser.add_argument("--quantizacao", default="auto", choices=("auto", "float32", "int16"))
+    parser.add_argument("--threads", type=int, default=None)
+    args = parser.parse_args(argumentos)
+
+    comprimir_captura(args.origem, args.destino, Fs=args.Fs, formato=args.formato,
+                      canais=args.canais, segundos_por_chunk=args.segundos_por_chunk,
+                      compressor=args.compressor, nivel=args.nivel,
+                      quantizacao=args.quantizacao, threads=args.threads)
+
+
+if __name__ == "__main__":
+    main()
@@ -26,9 +26,16 @@ def filtro_passa_alta(freq_corte, fs, ordem=5):
 # Portadoras I/Q
 # ------------------------------------------------------------------------------
 
-def gerar_portadora_MSK_base(Fs, Fc, Baud, total_samples, fase=0, Teste=0):
-    """Gera portadoras I/Q para MSK com parâmetros opcionais de teste."""
-    t = np.arange(total_samples) / Fs
+def gerar_portadora_MSK_base(Fs, Fc, Baud, total_samples, fase=0, Teste=0, amostra_inicial=0,
+                             atraso_simbolo=0.0):
+    """
+    Gera portadoras I/Q para MSK com parâmetros opcionais de teste.
+    'amostra_inicial' mantém as portadoras contínuas entre blocos de
+    tamanho arbitrário (tempo absoluto desde o início do fluxo) e
+    'atraso_simbolo' (amostras) desloca só a envoltória MSK, acompanhando
+    o sincronismo de símbolo.
+    """
+    t = (amostra_inicial + np.arange(total_samples)) / Fs
     M = 4
     Tb = 1 / (Baud * np.log2(M))
     Fck = 1 / (4 * Tb)
@@ -39,12 +46,12 @@ def gerar_portadora_MSK_base(Fs, Fc, Baud, total_samples, fase=0, Teste=0):
        fase_port = fase
     else:
        fase = np.asarray(fase)
-       if len(fase) != len(t):
+       if fase.shape[-1] != len(t):  # (N,) ou (K, N) no modo em lote
            raise ValueError("fase (GPS) deve ter o mesmo número de amostras que o sinal")
        fase_MSK = fase
        fase_port = fase
 
-    argumento_MSK = 2 * np.pi * Fck * t
+    argumento_MSK = 2 * np.pi * Fck * (t - atraso_simbolo / Fs)
     argumento_portadora = 2 * np.pi * Fc * t
 
     msk_cos = np.cos(argumento_MSK + fase_MSK)
@@ -87,6 +94,137 @@ def integrar_canal(sinal, N_bit, start=0):
     return np.array(integrados)
 
 
+# ------------------------------------------------------------------------------
+# Sincronismo de símbolo contínuo entre blocos
+# ------------------------------------------------------------------------------
+
+class SincronizadorSimbolos:
+    """
+    Integração por bit com estado entre blocos: a grade de janelas de N_bit
+    amostras é contínua ao longo do fluxo, as amostras que sobram no fim de
+    um bloco entram no próximo e a última janela de I fica guardada para a
+    decisão que depende de I[k+1]. O índice global das janelas mantém a
+    paridade par/ímpar das decisões em blocos de qualquer tamanho.
+
+    A fase da grade é ajustada por um detector de erro de Gardner por braço.
+    No MSK cada símbolo de I e de Q dura 2 janelas (2*N_bit), com Q
+    deslocado de uma janela: y[m] é a integral do símbolo (soma de duas
+    janelas), y[m-1/2] a integral N_bit antes, sobre a transição, e
+    e = (y[m] - y[m-1]) * y[m-1/2]. O erro é calculado de forma vetorizada
+    sobre as janelas de cada chamada e a correção é aplicada uma vez por
+    chamada, o que basta para acompanhar a deriva lenta do relógio da placa
+    de som.
+
+    Parâmetros:
+        N_bit (int): Amostras por bit (Fs / Rb).
+        ganho (float): Ganho do laço (0 = grade fixa, sem correção).
+        max_correcao (float): Correção máxima por chamada (amostras).
+    """
+
+    def __init__(self, N_bit, ganho=1.5, max_correcao=None):
+        self.N_bit = N_bit
+        self.ganho = ganho
+        self.max_correcao = max_correcao if max_correcao is not None else N_bit / 8
+
+        self.amostra_inicial = 0      # Amostra absoluta do próximo bloco
+        self.proxima_janela = 0.0     # Início (absoluto) da próxima janela
+        self.janela_global = 0        # Índice global da próxima janela
+        self.erro_tempo = 0.0         # Último erro de Gardner normalizado
+        self._reiniciar_estado()
+
+    @property
+    def atraso(self):
+        """Deslocamento atual da grade de símbolos (amostras)."""
+        return self.proxima_janela - self.N_bit * self.janela_global
+
+    def _reiniciar_estado(self):
+        self.resto_I = np.zeros(0)
+        self.resto_Q = np.zeros(0)
+        self.inicio_resto = self.amostra_inicial
+        self.anterior = None          # (I, Q) da última janela completa
+        self.historico_I = np.zeros(0)  # Até 2 janelas antes dela (detector)
+        self.historico_Q = np.zeros(0)
+
+    def pular(self, n_amostras):
+        """
+        Avança o fluxo sem processar (bloco descartado). A grade continua a
+        mesma, mas nenhuma janela atravessa o buraco.
+        """
+        self.amostra_inicial += n_amostras
+        saltos = max(int(np.ceil((self.amostra_inicial - self.proxima_janela) / self.N_bit)), 0)
+        self.proxima_janela += saltos * self.N_bit
+        self.janela_global += saltos
+        self._reiniciar_estado()
+
+    def processar(self, I_filtrado, Q_filtrado):
+        """
+        Integra as janelas completas disponíveis.
+
+        Retorno:
+            simbolos_I: I das janelas k, k+1, ... (inclui a janela guardada)
+            simbolos_Q: Q das janelas k+1, k+2, ... (len(simbolos_I) - 1)
+            paridade: paridade global da primeira decisão (k)
+        """
+        N = self.N_bit
+        I = np.concatenate((self.resto_I, I_filtrado))
+        Q = np.concatenate((self.resto_Q, Q_filtrado))
+        inicio = self.inicio_resto
+        self.amostra_inicial += len(I_filtrado)
+
+        # Somas acumuladas: qualquer janela sai com duas leituras
+        soma_I = np.concatenate(([0.0], np.cumsum(I)))
+        soma_Q = np.concatenate(([0.0], np.cumsum(Q)))
+
+        n_janelas = max(int(np.floor((inicio + len(I) - N - self.proxima_janela) / N)) + 1, 0)
+        posicoes = self.proxima_janela + N * np.arange(n_janelas)
+        a = np.round(posicoes - inicio).astype(np.int64)
+        janelas_I = (soma_I[a + N] - soma_I[a]) / N
+        janelas_Q = (soma_Q[a + N] - soma_Q[a]) / N
+
+        if self.anterior is not None:
+            janelas_I = np.concatenate(([self.anterior[0]], janelas_I))
+            janelas_Q = np.concatenate(([self.anterior[1]], janelas_Q))
+        paridade = (self.janela_global - (1 if self.anterior is not None else 0)) % 2
+
+        # Detector de Gardner por braço: símbolo de I nas janelas (ímpar, par)
+        # e de Q nas janelas (par, ímpar) do índice global
+        detector_I = np.concatenate((self.historico_I, janelas_I))
+        detector_Q = np.concatenate((self.historico_Q, janelas_Q))
+        paridade_detector = (paridade - len(self.historico_I)) % 2
+        correcao = 0.0
+        if self.ganho and len(detector_I) >= 4:
+            simbolo_I = detector_I[1:] + detector_I[:-1]  # integral de 2 janelas
+            simbolo_Q = detector_Q[1:] + detector_Q[:-1]
+            braco_I = (np.arange(3, len(detector_I)) + paridade_detector) % 2 == 0
+            erro = np.where(braco_I,
+                            (simbolo_I[2:] - simbolo_I[:-2]) * simbolo_I[1:-1],
+                            (simbolo_Q[2:] - simbolo_Q[:-2]) * simbolo_Q[1:-1])
+            potencia = np.mean(simbolo_I**2 + simbolo_Q**2)
+            if potencia > 0:
+                # Erro positivo: grade atrasada em relação aos símbolos
+                self.erro_tempo = np.mean(erro) / potencia
+                correcao = np.clip(-self.ganho * self.erro_tempo * N,
+                                   -self.max_correcao, self.max_correcao)
+
+        # Estado para o próximo bloco
+        if n_janelas:
+            self.historico_I = detector_I[-3:-1]
+            self.historico_Q = detector_Q[-3:-1]
+            self.anterior = (janelas_I[-1], janelas_Q[-1])
+        self.proxima_janela += n_janelas * N + correcao
+        self.janela_global += n_janelas
+
+        corte = max(int(np.floor(self.proxima_janela - inicio)), 0)
+        corte = min(corte, len(I))
+        self.resto_I = I[corte:]
+        self.resto_Q = Q[corte:]
+        self.inicio_resto = inicio + corte
+
+        if len(janelas_I) < 2:
+            return np.zeros(0), np.zeros(0), paridade
+        return janelas_I, janelas_Q[1:], paridade
+
+
 # ------------------------------------------------------------------------------
 # Decisão de bit com base na fase
 # ------------------------------------------------------------------------------
@@ -110,13 +248,74 @@ def decisor_de_fase(Li, Lq, impar=False):
     elif Vec_bit == [np.pi, -np.pi/2]: return 1, Vec_bit[0], Vec_bit[1]
     else: return -1
 
+def decidir_bits(simbolos_I, simbolos_Q, paridade=0):
+    """
+    Decisão bit a bit: k par usa (I[k], Q[k]), k ímpar usa (I[k+1], Q[k]).
+    'paridade' é a paridade global do primeiro k (sincronismo contínuo).
+    """
+    bits_recuperados = []
+    fase_esperada = []
+    for k in range(min(len(simbolos_I) - 1, len(simbolos_Q))):
+        if (k + paridade) % 2 == 0:
+            bit, th0, thpi = decisor_de_fase(simbolos_I[k], simbolos_Q[k], impar=False)
+        else:
+            bit, thpi, th0 = decisor_de_fase(simbolos_I[k+1], simbolos_Q[k], impar=True)
+        if bit != -1:
+            bits_recuperados.append(bit)
+            fase_esperada.append(th0 if (k + paridade) % 2 == 0 else thpi)
+    return bits_recuperados, fase_esperada
+
+def decodificar_simbolos(simbolos_I, simbolos_Q, paridade=0, extrair_ascii=False):
+    """
+    Etapa final comum aos demoduladores: fase integrada, decisão dos bits,
+    ASCII opcional e amplitude vetorial a partir dos símbolos integrados.
+
+    Retorno:
+        bits, ASCII, fase_esperada, fase_integrada, Amp, simbolos_I, simbolos_Q
+    """
+    # Fase integrada (plano IQ)
+    fase_integrada = np.angle(simbolos_I[:len(simbolos_Q)] + 1j * simbolos_Q[:len(simbolos_I)])
+
+    # Decodificação dos bits
+    bits_recuperados, fase_esperada = decidir_bits(simbolos_I, simbolos_Q, paridade)
+
+    # ASCII opcional
+    ASCII72 = []
+    if extrair_ascii:
+        bytes_rec7 = [
+            int("".join(str(b) for b in bits_recuperados[i:i+7]), 2)
+            for i in range(0, len(bits_recuperados) - 7, 7)
+        ]
+        ASCII72 = [
+            val for val in bytes_rec7
+            if (32 <= val <= 96) or (123 <= val <= 126)
+        ]
+
+    # Amplitude vetorial
+    Amp = np.sqrt(simbolos_Q[:len(simbolos_I)]**2 + simbolos_I[:len(simbolos_Q)]**2)
+
+    return (
+        np.array(bits_recuperados),
+        np.array(ASCII72),
+        np.array(fase_esperada),
+        np.array(fase_integrada),
+        np.array(Amp),
+        np.array(simbolos_I),
+        np.array(simbolos_Q)
+    )
+
 # ------------------------------------------------------------------------------
 # Demodulação Principal
 # ------------------------------------------------------------------------------
 
-def demodular_MSK2(sinal_VLF, sinal_CGPS, Fs, Rs, Fc, GPS=False, extrair_ascii=False, Teste=0):
+def demodular_MSK2(sinal_VLF, sinal_CGPS, Fs, Rs, Fc, GPS=False, extrair_ascii=False, Teste=0,
+                   sincronizador=None):
     """
     Demodulador MSK para sinais VLF.
+
+    Com 'sincronizador' (SincronizadorSimbolos) a integração por bit e as
+    portadoras são contínuas entre chamadas, e o bloco pode ter qualquer
+    tamanho; sem ele, cada bloco é tratado como um sinal independente.
     """
 
     Rb = Rs * 2
@@ -126,8 +325,12 @@ def demodular_MSK2(sinal_VLF, sinal_CGPS, Fs, Rs, Fc, GPS=False, extrair_ascii=F
 
     # Geração de portadoras
     fase_gps = sinal_CGPS if GPS else 0
+    amostra_inicial, atraso = 0, 0.0
+    if sincronizador is not None:
+        amostra_inicial, atraso = sincronizador.amostra_inicial, sincronizador.atraso
     portadora_sin, portadora_cos = gerar_portadora_MSK_base(
-        Fs, Fc, Rs, total_samples, fase=fase_gps, Teste=Teste
+        Fs, Fc, Rs, total_samples, fase=fase_gps, Teste=Teste,
+        amostra_inicial=amostra_inicial, atraso_simbolo=atraso
     )
 
     # Filtro passa-alta para remover esferics
@@ -144,45 +347,117 @@ def demodular_MSK2(sinal_VLF, sinal_CGPS, Fs, Rs, Fc, GPS=False, extrair_ascii=F
     Q_filtrado = 2 * signal.filtfilt(b_lp, a_lp, sinal_Q)
 
     # Integração por símbolo
-    simbolos_I = integrar_canal(I_filtrado, N_bit, start=0)
-    simbolos_Q = integrar_canal(Q_filtrado, N_bit, start=1)
+    paridade = 0
+    if sincronizador is not None:
+        simbolos_I, simbolos_Q, paridade = sincronizador.processar(I_filtrado, Q_filtrado)
+    else:
+        simbolos_I = integrar_canal(I_filtrado, N_bit, start=0)
+        simbolos_Q = integrar_canal(Q_filtrado, N_bit, start=1)
 
-    # Fase integrada (plano IQ)
-    fase_integrada = np.angle(simbolos_I[:len(simbolos_Q)] + 1j * simbolos_Q[:len(simbolos_I)])
+    return decodificar_simbolos(simbolos_I, simbolos_Q, paridade, extrair_ascii)
 
-    # Decodificação dos bits
-    bits_recuperados = []
-    fase_esperada = []
-    for k in range(min(len(simbolos_I) - 1, len(simbolos_Q))):
-        if k % 2 == 0:
-            bit, th0, thpi = decisor_de_fase(simbolos_I[k], simbolos_Q[k], impar=False)
-        else:
-            bit, thpi, th0 = decisor_de_fase(simbolos_I[k+1], simbolos_Q[k], impar=True)
-        if bit != -1:
-            bits_recuperados.append(bit)
-            fase_esperada.append(th0 if k % 2 == 0 else thpi)
 
-    # ASCII opcional
-    ASCII72 = []
-    if extrair_ascii:
-        bytes_rec7 = [
-            int("".join(str(b) for b in bits_recuperados[i:i+7]), 2)
-            for i in range(0, len(bits_recuperados) - 7, 7)
-        ]
-        ASCII72 = [
-            val for val in bytes_rec7
-            if (32 <= val <= 96) or (123 <= val <= 126)
-        ]
+# ------------------------------------------------------------------------------
+# Demodulação em lote (K blocos por chamada)
+# ------------------------------------------------------------------------------
 
-    # Amplitude vetorial
-    Amp = np.sqrt(simbolos_Q[:len(simbolos_I)]**2 + simbolos_I[:len(simbolos_Q)]**2)
+class DemoduladorLote:
+    """
+    Mesmo resultado de demodular_MSK2 para K blocos de mesmo tamanho de uma
+    vez: os blocos são empilhados em (K, N) e filtros, mistura, integração e
+    decisões rodam ao longo do eixo 1, uma chamada por etapa. Portadoras e
+    coeficientes dos filtros são calculados uma única vez e os buffers da
+    mistura I/Q são reaproveitados entre chamadas.
+
+    Parâmetros:
+        Fs (float): Taxa de amostragem (Hz).
+        Rs (float): Taxa de símbolos (baud).
+        Fc (float): Frequência da portadora (Hz).
+        tamanho_bloco (int): N, amostras por bloco.
+        lote (int): K máximo de blocos por chamada (ajuste à cache/memória).
+        Teste (int): Modo de teste das portadoras (0-3).
+    """
 
-    return (
-        np.array(bits_recuperados),
-        np.array(ASCII72),
-        np.array(fase_esperada),
-        np.array(fase_integrada),
-        np.array(Amp),
-        np.array(simbolos_I),
-        np.array(simbolos_Q)
-    )
+    def __init__(self, Fs, Rs, Fc, tamanho_bloco, lote=16, Teste=0):
+        self.Fs = Fs
+        self.Rs = Rs
+        self.Fc = Fc
+        self.Teste = Teste
+        self.tamanho_bloco = tamanho_bloco
+        self.N_bit = int(Fs * (1 / (Rs * 2)))
+        self.n_janelas = tamanho_bloco // self.N_bit
+
+        # Portadoras sem correção de GPS: iguais para todos os blocos
+        self.portadora_sin, self.portadora_cos = gerar_portadora_MSK_base(
+            Fs, Fc, Rs, tamanho_bloco, fase=0, Teste=Teste
+        )
+        self.b_fase, self.a_fase = filtro_passa_alta(12000, Fs)
+        self.b_lp, self.a_lp = filtro_passa_baixa(Rs, Fs)
+
+        self.buffer_I = np.empty((lote, tamanho_bloco))
+        self.buffer_Q = np.empty((lote, tamanho_bloco))
+        self.pesos_ASCII = 2 ** np.arange(6, -1, -1)
+
+    def processar(self, blocos, correcoes_GPS=None, extrair_ascii=False):
+        """
+        Demodula os blocos (K, N).
+
+        Parâmetros:
+            blocos: array (K, N) com K <= lote.
+            correcoes_GPS: array (K, N) de correção de fase (rad) ou None.
+
+        Retorno:
+            bits, ASCII (lista com um array por bloco), fase_esperada,
+            fase_integrada, Amp, simbolos_I, simbolos_Q; arrays com uma
+            linha por bloco.
+        """
+        K = len(blocos)
+        N_bit = self.N_bit
+
+        if correcoes_GPS is None:
+            portadora_sin, portadora_cos = self.portadora_sin, self.portadora_cos
+        else:
+            portadora_sin, portadora_cos = gerar_portadora_MSK_base(
+                self.Fs, self.Fc, self.Rs, self.tamanho_bloco, fase=correcoes_GPS, Teste=self.Teste
+            )
+
+        # Filtro passa-alta e mistura I/Q (buffers reaproveitados)
+        sinal_filtrado = signal.filtfilt(self.b_fase, self.a_fase, blocos, axis=1)
+        sinal_I = np.multiply(sinal_filtrado, portadora_sin, out=self.buffer_I[:K])
+        sinal_Q = np.multiply(sinal_filtrado, portadora_cos, out=self.buffer_Q[:K])
+
+        I_filtrado = 2 * signal.filtfilt(self.b_lp, self.a_lp, sinal_I, axis=1)
+        Q_filtrado = 2 * signal.filtfilt(self.b_lp, self.a_lp, sinal_Q, axis=1)
+
+        # Integração por símbolo: janelas de N_bit amostras via reshape
+        n = self.n_janelas
+        simbolos_I = I_filtrado[:, :n * N_bit].reshape(K, n, N_bit).sum(axis=2) / N_bit
+        simbolos_Q = Q_filtrado[:, :n * N_bit].reshape(K, n, N_bit).sum(axis=2)[:, 1:] / N_bit
+
+        # Decisões vetorizadas (mesma tabela de decisor_de_fase):
+        #   k par   -> bit = (I[k] > 0) XOR (Q[k] > 0),   fase = 0 ou pi pelo sinal de I[k]
+        #   k ímpar -> bit = (I[k+1] > 0) == (Q[k] > 0),  fase = -pi/2 ou pi/2 pelo sinal de Q[k]
+        M = min(n - 1, simbolos_Q.shape[1])
+        par = np.arange(M) % 2 == 0
+        I_positivo = np.where(par, simbolos_I[:, :M], simbolos_I[:, 1:M + 1]) > 0
+        Q_positivo = simbolos_Q[:, :M] > 0
+
+        bits = np.where(par, I_positivo ^ Q_positivo, I_positivo == Q_positivo).astype(np.int64)
+        fase_esperada = np.where(par,
+                                 np.where(I_positivo, 0.0, np.pi),
+                                 np.where(Q_positivo, -np.pi / 2, np.pi / 2))
+
+        # Fase integrada e amplitude vetorial
+        z = simbolos_I[:, :simbolos_Q.shape[1]] + 1j * simbolos_Q
+        fase_integrada = np.angle(z)
+        Amp = np.abs(z)
+
+        # ASCII opcional (grupos de 7 bits de cada bloco)
+        ASCII72 = []
+        if extrair_ascii:
+            grupos = len(range(0, M - 7, 7))
+            valores = bits[:, :7 * grupos].reshape(K, grupos, 7) @ self.pesos_ASCII
+            validos = ((32 <= valores) & (valores <= 96)) | ((123 <= valores) & (valores <= 126))
+            ASCII72 = [v[m] for v, m in zip(valores, validos)]
+
+        return bits, ASCII72, fase_esperada, fase_integrada, Amp, simbolos_I, simbolos_Q
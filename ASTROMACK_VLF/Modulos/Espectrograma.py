@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+Quicklook espectral da captura: espectrograma do dia e potência por portadora
+
+Numa única passagem pelo LeitorSinalVLF, cada bloco é dividido em segmentos
+com janela de Hann e 50% de sobreposição (Welch). Os espectros são somados
+e, a cada 'segundos_por_coluna' (1 minuto por padrão), viram uma coluna do
+espectrograma na banda VLF. A potência na banda de cada portadora é
+registrada por bloco. A memória usada é a do espectrograma final
+(~11 MB por dia com os valores padrão), independente do tamanho da captura.
+
+Mostra quais transmissores estavam no ar, linhas de interferência e
+períodos de tempestade de esféricos antes de confiar na demodulação.
+"""
+
+import os
+import numpy as np
+import scipy.fft
+import scipy.signal as signal
+import matplotlib.pyplot as plt
+from tqdm import tqdm
+
+from .Leitor_Sinal import antecipar
+
+
+# -----------------------------------------------------------------------------
+#  ACUMULADOR
+# -----------------------------------------------------------------------------
+
+class EspectrogramaDiario:
+    """
+    Parâmetros:
+        Fs (int): Taxa de amostragem (Hz).
+        portadoras (dict): Nome -> frequência (Hz) das portadoras acompanhadas.
+        largura_banda (float): Largura total (Hz) da banda de cada portadora.
+        segundos_por_coluna (float): Duração de cada coluna do espectrograma.
+        nperseg (int): Amostras por segmento de Welch.
+        banda (tuple): Faixa de frequências (Hz) guardada no espectrograma.
+        tempo_inicial_UT (float): Hora UT do primeiro bloco.
+    """
+
+    def __init__(self, Fs, portadoras=None, largura_banda=400, segundos_por_coluna=60,
+                 nperseg=4096, banda=(3000, 48000), tempo_inicial_UT=0.0):
+        self.Fs = Fs
+        self.nperseg = nperseg
+        self.passo = nperseg // 2
+        self.segundos_por_coluna = segundos_por_coluna
+        self.tempo_inicial_UT = tempo_inicial_UT
+
+        self.janela = signal.get_window("hann", nperseg).astype(np.float32)
+        # Densidade espectral unilateral (unidade²/Hz), como em scipy.signal.welch
+        self.escala = np.full(nperseg // 2 + 1, 2.0 / (Fs * np.sum(self.janela.astype(np.float64) ** 2)))
+        self.escala[0] /= 2
+        if nperseg % 2 == 0:
+            self.escala[-1] /= 2  # Nyquist
+
+        frequencias = np.fft.rfftfreq(nperseg, 1 / Fs)
+        self.df = frequencias[1]
+        self.selecao = np.flatnonzero((frequencias >= banda[0]) & (frequencias <= banda[1]))
+        self.frequencias = frequencias[self.selecao]
+
+        self.portadoras = dict(portadoras or {})
+        self.bins_portadoras = {
+            nome: np.flatnonzero(np.abs(frequencias - Fc) <= largura_banda / 2)
+            for nome, Fc in self.portadoras.items()
+        }
+
+        self.colunas = []
+        self.potencias = {nome: [] for nome in self.portadoras}
+        self.soma = np.zeros(len(self.selecao))
+        self.segmentos = 0
+        self.amostras_coluna = 0
+        self.blocos = 0
+        self.duracao_bloco = 0.0
+
+    def adicionar_bloco(self, bloco):
+        """Acumula o espectro de Welch do bloco."""
+        x = np.nan_to_num(np.asarray(bloco, dtype=np.float32), nan=0.0)
+        if len(x) >= self.nperseg:
+            segmentos = np.lib.stride_tricks.sliding_window_view(x, self.nperseg)[::self.passo]
+            segmentos = segmentos - segmentos.mean(axis=1, keepdims=True)
+            espectros = scipy.fft.rfft(segmentos * self.janela, axis=1)  # float32: complex64
+            espectros = espectros.real ** 2 + espectros.imag ** 2
+            psd = espectros.mean(axis=0, dtype=np.float64) * self.escala
+
+            self.soma += psd[self.selecao] * len(segmentos)
+            self.segmentos += len(segmentos)
+        else:
+            psd = np.zeros(self.nperseg // 2 + 1)
+
+        for nome, bins in self.bins_portadoras.items():
+            self.potencias[nome].append(np.sum(psd[bins]) * self.df)
+
+        if not self.blocos:
+            self.duracao_bloco = len(x) / self.Fs
+        self.blocos += 1
+        self.amostras_coluna += len(x)
+        if self.amostras_coluna >= self.segundos_por_coluna * self.Fs:
+            self._fechar_coluna()
+
+    def _fechar_coluna(self):
+        media = self.soma / self.segmentos if self.segmentos else np.full(len(self.soma), np.nan)
+        self.colunas.append(media.astype(np.float32))
+        self.soma[:] = 0
+        self.segmentos = 0
+        self.amostras_coluna = 0
+
+    def finalizar(self):
+        """Fecha a última coluna (parcial)."""
+        if self.amostras_coluna:
+            self._fechar_coluna()
+
+    # -------------------------------------------------------------------------
+    #  Resultados
+    # -------------------------------------------------------------------------
+
+    @property
+    def espectro_db(self):
+        """(colunas, frequências) em dB re 1 unidade²/Hz."""
+        if not self.colunas:
+            return np.zeros((0, len(self.frequencias)), dtype=np.float32)
+        with np.errstate(divide="ignore"):
+            return (10 * np.log10(np.stack(self.colunas))).astype(np.float32)
+
+    @property
+    def tempo_UT(self):
+        """Hora UT do início de cada coluna."""
+        return self.tempo_inicial_UT + np.arange(len(self.colunas)) * self.segundos_por_coluna / 3600
+
+    def potencia_db(self, nome):
+        """Potência na banda da portadora por bloco (dB re 1 unidade²)."""
+        with np.errstate(divide="ignore"):
+            return 10 * np.log10(np.array(self.potencias[nome]))
+
+    @property
+    def tempo_UT_blocos(self):
+        """Hora UT de cada bloco (série de potência das portadoras)."""
+        return self.tempo_inicial_UT + np.arange(self.blocos) * self.duracao_bloco / 3600
+
+    def salvar(self, caminho, nome_arquivo):
+        """Grava o espectrograma e as potências em '{nome_arquivo}.npz'."""
+        os.makedirs(caminho, exist_ok=True)
+        caminho_arquivo = os.path.join(caminho, f"{nome_arquivo}.npz")
+        np.savez(
+            caminho_arquivo,
+            espectro_db=self.espectro_db,
+            frequencias=self.frequencias,
+            tempo_UT=self.tempo_UT,
+            tempo_UT_blocos=self.tempo_UT_blocos,
+            portadoras=np.array(list(self.portadoras.values()), dtype=np.float64),
+            nomes_portadoras=np.array(list(self.portadoras)),
+            potencias_db=np.array([self.potencia_db(nome) for nome in self.portadoras]),
+        )
+        print(f"[QUICKLOOK] Espectrograma salvo em: {caminho_arquivo}")
+        return caminho_arquivo
+
+    def plotar(self, caminho, nome_arquivo, titulo=None):
+        """Grava '{nome_arquivo}.png': espectrograma e potência por portadora."""
+        os.makedirs(caminho, exist_ok=True)
+        espectro = self.espectro_db
+        finitos = espectro[np.isfinite(espectro)]
+        vmin, vmax = np.percentile(finitos, (5, 99.5)) if finitos.size else (None, None)
+
+        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 8), sharex=True,
+                                       gridspec_kw={"height_ratios": (3, 1)})
+        # Bordas das colunas: a última (parcial) termina no último bloco
+        bordas_t = np.append(self.tempo_UT, self.tempo_UT_blocos[-1] + self.duracao_bloco / 3600
+                             if self.blocos else self.tempo_inicial_UT)
+        bordas_f = np.append(self.frequencias - self.df / 2, self.frequencias[-1] + self.df / 2) / 1000
+        imagem = ax1.pcolormesh(bordas_t, bordas_f, espectro.T, cmap="viridis",
+                                vmin=vmin, vmax=vmax, shading="flat", rasterized=True)
+        fig.colorbar(imagem, ax=(ax1, ax2), label="DEP [dB]", pad=0.01)
+        ax1.set_ylabel("Frequência [kHz]")
+        ax1.set_title(titulo or "Espectrograma VLF")
+
+        for nome, Fc in self.portadoras.items():
+            ax1.axhline(Fc / 1000, color="w", lw=0.6, ls="--")
+            ax2.plot(self.tempo_UT_blocos, self.potencia_db(nome), lw=0.6, label=f"{nome} ({Fc / 1000:g} kHz)")
+        if self.portadoras:
+            ax2.legend(loc="upper right", fontsize="small")
+        ax2.set_ylabel("Potência [dB]")
+        ax2.set_xlabel("Horas UT")
+        ax2.grid()
+
+        caminho_arquivo = os.path.join(caminho, f"{nome_arquivo}.png")
+        fig.savefig(caminho_arquivo, dpi=120)
+        plt.close(fig)
+        print(f"[QUICKLOOK] Imagem salva em: {caminho_arquivo}")
+        return caminho_arquivo
+
+
+# -----------------------------------------------------------------------------
+#  PASSAGEM PELA CAPTURA
+# -----------------------------------------------------------------------------
+
+def main_espectrograma(Sinal_VLF, Taxa_de_amostragem, portadoras=None, largura_banda=400,
+                       segundos_por_coluna=60, nperseg=4096, banda=(3000, 48000),
+                       tempo_inicial_UT=0.0, antecipacao=2):
+    """
+    Quicklook espectral da captura em uma passagem.
+
+    Parâmetros:
+        Sinal_VLF: iterador de blocos do sinal VLF (classe LeitorSinalVLF)
+        Taxa_de_amostragem: taxa de amostragem do sinal (Hz)
+        portadoras, largura_banda, segundos_por_coluna, nperseg, banda,
+        tempo_inicial_UT: ver EspectrogramaDiario
+        antecipacao: blocos lidos à frente em thread de fundo
+
+    Retorno:
+        EspectrogramaDiario finalizado
+    """
+    aquecimento = getattr(Sinal_VLF, "blocos_aquecimento", 0)
+    total = Sinal_VLF.total_blocos
+    Sinal_VLF = antecipar(Sinal_VLF, antecipacao)
+
+    espectrograma = EspectrogramaDiario(Taxa_de_amostragem, portadoras, largura_banda,
+                                        segundos_por_coluna, nperseg, banda, tempo_inicial_UT)
+    for k, bloco in enumerate(tqdm(Sinal_VLF, total=total, desc="Quicklook espectral", unit="bloco")):
+        if k < aquecimento:
+            continue  # margem antes da janela: fora do quicklook
+        espectrograma.adicionar_bloco(bloco)
+    espectrograma.finalizar()
+    return espectrograma
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Estimador rápido de amplitude e fase da portadora MSK (modo leve)
+
+Em vez da demodulação completa, eleva o bloco ao quadrado e mede as duas
+raias espectrais geradas pelo par de tons MSK (Fc ± Rs/2), que aparecem em
+2(Fc ± Rs/2) livres da modulação dos dados. Cada raia é um único bin de DFT
+(mesmo resultado do algoritmo de Goertzel), calculado como produto escalar
+com núcleos pré-computados, ou seja, poucas operações por amostra.
+"""
+
+import numpy as np
+from tqdm import tqdm
+
+from .Produtos_Online import DesembrulhadorFase
+
+
+# -----------------------------------------------------------------------------
+#  BANCO DE TONS
+# -----------------------------------------------------------------------------
+
+class EstimadorPortadoraMSK:
+    """
+    Estima a amplitude RMS e a fase da portadora MSK bloco a bloco.
+
+    Parâmetros:
+        Fs (float): Taxa de amostragem (Hz).
+        Rs (float): Taxa de símbolos (baud).
+        Fc (float): Frequência da portadora (Hz).
+        tamanho_bloco (int): Amostras por bloco (padrão: 1 segundo).
+    """
+
+    def __init__(self, Fs, Rs, Fc, tamanho_bloco=None):
+        self.Fs = Fs
+        self.tamanho_bloco = tamanho_bloco if tamanho_bloco else int(Fs)
+
+        # Raias do sinal ao quadrado: dobro do par de tons MSK
+        self.freqs = 2 * np.array([Fc - Rs / 2, Fc + Rs / 2])
+
+        # Núcleos cos/sin em uma única matriz real (4, N) para um só produto BLAS
+        t = np.arange(self.tamanho_bloco) / Fs
+        argumento = 2 * np.pi * self.freqs[:, None] * t
+        self.nucleos = np.vstack((np.cos(argumento), np.sin(argumento)))
+
+        self.desembrulhador = DesembrulhadorFase()
+        self.amostra_inicial = 0
+
+    def processar(self, bloco):
+        """
+        Retorna (amplitude_rms, fase_graus) do bloco. A fase é contínua entre
+        blocos (desembrulhada em 4φ antes da divisão, eliminando a
+        ambiguidade de π/2 do quadrado).
+        """
+        bloco = np.asarray(bloco, dtype=np.float64)
+        quadrado = bloco * bloco
+
+        re_cos = self.nucleos @ quadrado
+        raias = (re_cos[:2] - 1j * re_cos[2:]) / self.tamanho_bloco
+
+        # Referência de tempo absoluta: início do bloco na captura
+        raias *= np.exp(-2j * np.pi * self.freqs * self.amostra_inicial / self.Fs)
+        self.amostra_inicial += self.tamanho_bloco
+
+        # |L1| + |L2| = A²/4 para uma portadora MSK de amplitude A
+        amplitude = 2 * np.sqrt(np.sum(np.abs(raias)))
+        amplitude_rms = amplitude / np.sqrt(2)
+
+        # arg L1 + arg L2 = 4φ (o deslocamento de tempo dos bits se cancela)
+        quatro_fi = np.angle(raias[0] * raias[1])
+        fase = self.desembrulhador.processar([quatro_fi])[0] / 4
+        return amplitude_rms, np.degrees(fase)
+
+
+# -----------------------------------------------------------------------------
+#  LAÇO PRINCIPAL (MODO LEVE)
+# -----------------------------------------------------------------------------
+
+def main_Estimador(Sinal_VLF, Taxa_de_amostragem, Rs, Fc,
+                   epsilon=1e-6, P_referencia=5e-6):
+    """
+    Modo leve: amplitude (dB) e fase da portadora (graus) com resolução de
+    um bloco (1 s), sem recuperação de bits.
+
+    Parâmetros:
+        Sinal_VLF: iterador de blocos do sinal VLF (classe LeitorSinalVLF)
+        Taxa_de_amostragem: taxa de amostragem do sinal (Hz)
+        Rs: taxa de símbolos (baud)
+        Fc: frequência da portadora (Hz)
+        epsilon: valor mínimo da amplitude para evitar log de zero
+        P_referencia: potência de referência para dB
+
+    Retorno:
+        Amplitude_db: amplitude por bloco (dB)
+        fase: fase da portadora por bloco (graus)
+    """
+    estimador = EstimadorPortadoraMSK(Taxa_de_amostragem, Rs, Fc,
+                                      tamanho_bloco=Sinal_VLF.tamanho_bloco)
+    # Fase referenciada ao início da captura, mesmo na leitura por janela
+    estimador.amostra_inicial = getattr(Sinal_VLF, "bloco_inicial", 0) * Sinal_VLF.tamanho_bloco
+    aquecimento = getattr(Sinal_VLF, "blocos_aquecimento", 0)
+    Amplitude = np.zeros(Sinal_VLF.total_blocos)
+    fase = np.zeros(Sinal_VLF.total_blocos)
+
+    k = 0
+    for bloco in tqdm(Sinal_VLF, total=Sinal_VLF.total_blocos,
+                      desc="Estimando portadora", unit="bloco"):
+        Amplitude[k], fase[k] = estimador.processar(np.nan_to_num(bloco, nan=0.0))
+        k += 1
+
+    Amplitude = np.maximum(Amplitude[aquecimento:k], epsilon)
+    Amplitude_db = -20 * np.log10(Amplitude / P_referencia)
+    return Amplitude_db, fase[aquecimento:k]
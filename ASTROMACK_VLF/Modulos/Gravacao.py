@@ -9,6 +9,7 @@ Autor: Vitor Rafael Zandarim
 import numpy as np
 from astropy.table import Table
 from astropy.io import fits
+import gzip
 import os
 
 
@@ -83,6 +84,83 @@ def salvar_txt(dados, caminho, nome_arquivo, colunas=None, fmt="%.10f"):
     print(f"[TXT] Arquivo salvo em: {caminho_completo}")
 
 
+def salvar_txt_rapido(dados, caminho, nome_arquivo, colunas=None, fmt="%.10f",
+                      compactar=False, linhas_por_bloco=100_000):
+    """
+    Versão rápida de salvar_txt para tabelas grandes (fase do dia inteiro).
+    Formata cada pedaço de 'linhas_por_bloco' linhas com uma única operação
+    de '%' sobre a string da linha repetida, em vez de uma por linha como o
+    np.savetxt.
+
+    Parâmetros:
+    - dados: array 1D ou 2D (linhas x colunas)
+    - caminho: pasta de destino
+    - nome_arquivo: nome do arquivo sem extensão
+    - colunas: lista de nomes das colunas (opcional)
+    - fmt: formato único ou lista com um formato por coluna
+    - compactar: grava .txt.gz (gzip)
+    - linhas_por_bloco: linhas formatadas por vez (limita a memória)
+    """
+    os.makedirs(caminho, exist_ok=True)
+    caminho_completo = os.path.join(caminho, nome_arquivo + (".txt.gz" if compactar else ".txt"))
+
+    dados = np.asarray(dados, dtype=np.float64)
+    if dados.ndim == 1:
+        dados = dados[:, None]
+
+    formatos = [fmt] * dados.shape[1] if isinstance(fmt, str) else list(fmt)
+    linha = "\t".join(formatos) + "\n"
+
+    abrir = (lambda: gzip.open(caminho_completo, 'wt', compresslevel=6)) if compactar \
+        else (lambda: open(caminho_completo, 'w'))
+
+    with abrir() as f:
+        if colunas:
+            f.write("\t".join(colunas) + "\n")
+        for inicio in range(0, len(dados), linhas_por_bloco):
+            bloco = dados[inicio:inicio + linhas_por_bloco]
+            f.write((linha * len(bloco)) % tuple(bloco.ravel().tolist()))
+
+    print(f"[TXT] Arquivo salvo em: {caminho_completo}")
+
+
+def formato_tempo_UT(passo_s):
+    """
+    Formato da coluna de tempo (horas UT) com as casas decimais necessárias
+    para resolver 'passo_s' segundos, sem as 10 casas fixas.
+    """
+    casas = int(np.ceil(np.log10(3600 / passo_s))) + 2 if passo_s > 0 else 10
+    return f"%.{max(casas, 1)}f"
+
+
+def decimar_serie(tempo_UT, valores, cadencia_s, tempo_inicial_UT=None):
+    """
+    Média de 'valores' em intervalos de 'cadencia_s' segundos. Os tempos
+    de saída vêm do início mais o índice do intervalo (não de um linspace
+    que supõe 24 h exatas); intervalos sem dados ficam NaN.
+
+    Retorno:
+        (tempo_UT, valores) decimados
+    """
+    tempo_UT = np.asarray(tempo_UT, dtype=np.float64)
+    valores = np.asarray(valores, dtype=np.float64)
+    if tempo_inicial_UT is None:
+        tempo_inicial_UT = tempo_UT[0] if tempo_UT.size else 0.0
+
+    # Arredonda os segundos para evitar erro de ponto flutuante nas bordas
+    segundos = np.round((tempo_UT - tempo_inicial_UT) * 3600, 6)
+    indice = np.floor(segundos / cadencia_s).astype(np.int64)
+    validos = np.isfinite(valores) & (indice >= 0)
+
+    n = int(indice.max()) + 1 if indice.size else 0
+    soma = np.bincount(indice[validos], weights=valores[validos], minlength=n)
+    contagem = np.bincount(indice[validos], minlength=n)
+
+    media = np.full(n, np.nan)
+    np.divide(soma, contagem, out=media, where=contagem > 0)
+    return tempo_inicial_UT + np.arange(n) * cadencia_s / 3600, media
+
+
 def salvar_fits(caminho, nome_arquivo, dados, header1=None):
     """
     Salva os dados em formato FITS com cabeçalho opcional.
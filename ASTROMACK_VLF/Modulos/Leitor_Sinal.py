@@ -1,5 +1,473 @@
 
+import os
+import copy
+import json
+import lzma
+import queue
+import zlib
+import struct
+import threading
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+# -----------------------------------------------------------------------------
+#  FORMATOS DE CAPTURA
+# -----------------------------------------------------------------------------
+
+class FormatoBruto:
+    """
+    Captura sem cabeçalho (float32 do Audacity, int16 com escala, etc.),
+    mapeada em memória. Com N canais intercalados o mapeamento tem forma
+    (quadros, N) e cada canal é uma visão com passo, sem cópia.
+
+    Parâmetros:
+        caminho (str): Arquivo da captura.
+        dtype: Tipo das amostras no disco.
+        escala (float): Fator aplicado na conversão para float32.
+        deslocamento (int): Bytes de cabeçalho a ignorar.
+        canais (int): Número de canais intercalados.
+    """
+
+    Fs = None  # Sem cabeçalho: a taxa de amostragem vem da configuração
+
+    def __init__(self, caminho, dtype=np.float32, escala=1.0, deslocamento=0, canais=1):
+        self.dtype = np.dtype(dtype)
+        self.escala = escala
+        self.canais = canais
+        tamanho = os.path.getsize(caminho) - deslocamento
+        self.total_amostras = tamanho // (self.dtype.itemsize * canais)
+        self.dados = np.memmap(caminho, dtype=self.dtype, mode='r', offset=deslocamento,
+                               shape=(self.total_amostras, canais))
+
+    def ler(self, inicio, quantidade, canal=0):
+        """Retorna 'quantidade' amostras do canal a partir de 'inicio' em float32."""
+        trecho = np.asarray(self.dados[inicio:inicio + quantidade, canal])
+        if self.dtype == np.float32 and self.escala == 1.0:
+            return trecho
+        return trecho.astype(np.float32) * np.float32(self.escala)
+
+
+class FormatoWAV:
+    """
+    WAV (RIFF/RF64) PCM 16/24 bits ou float32, mapeado em memória. A taxa de
+    amostragem vem do cabeçalho.
+    """
+
+    def __init__(self, caminho):
+        with open(caminho, 'rb') as f:
+            riff, _, wave = struct.unpack('<4sI4s', f.read(12))
+            if riff not in (b'RIFF', b'RF64') or wave != b'WAVE':
+                raise ValueError(f"Arquivo não é WAV: {caminho}")
+
+            tamanho_ds64 = None
+            fmt = None
+            while True:
+                cabecalho = f.read(8)
+                if len(cabecalho) < 8:
+                    raise ValueError(f"WAV sem bloco 'data': {caminho}")
+                nome, tamanho = struct.unpack('<4sI', cabecalho)
+
+                if nome == b'ds64':
+                    ds64 = f.read(tamanho)
+                    tamanho_ds64 = struct.unpack('<Q', ds64[8:16])[0]
+                elif nome == b'fmt ':
+                    fmt = f.read(tamanho)
+                elif nome == b'data':
+                    deslocamento = f.tell()
+                    break
+                else:
+                    f.seek(tamanho + (tamanho & 1), 1)
+
+        if fmt is None:
+            raise ValueError(f"WAV sem bloco 'fmt ': {caminho}")
+
+        tag, self.canais, self.Fs, _, alinhamento, bits = struct.unpack('<HHIIHH', fmt[:16])
+        if tag == 0xFFFE:  # WAVE_FORMAT_EXTENSIBLE: formato real no subformato
+            tag = struct.unpack('<H', fmt[24:26])[0]
+
+        # Tamanho do 'data': RF64 usa o ds64; gravações longas podem vir
+        # com 0xFFFFFFFF ou truncadas, então limita ao tamanho do arquivo
+        restante = os.path.getsize(caminho) - deslocamento
+        if tamanho_ds64 is not None and tamanho == 0xFFFFFFFF:
+            tamanho = tamanho_ds64
+        tamanho = min(tamanho, restante)
+
+        if tag == 1 and bits == 16:
+            self.dtype, self.escala = np.dtype('<i2'), 1 / 2**15
+        elif tag == 1 and bits == 24:
+            self.dtype, self.escala = np.dtype('u1'), 1 / 2**23
+        elif tag == 3 and bits == 32:
+            self.dtype, self.escala = np.dtype('<f4'), 1.0
+        else:
+            raise ValueError(f"WAV não suportado: formato {tag}, {bits} bits")
+
+        self.bytes_amostra = bits // 8
+        self.total_amostras = tamanho // alinhamento  # quadros (uma amostra por canal)
+
+        # Forma (quadros, canais[, 3 bytes]): cada canal é uma visão com passo
+        forma = (self.total_amostras, self.canais)
+        if self.bytes_amostra == 3:
+            forma += (3,)
+        self.dados = np.memmap(caminho, dtype=self.dtype, mode='r', offset=deslocamento,
+                               shape=forma)
+
+    def ler(self, inicio, quantidade, canal=0):
+        """Retorna 'quantidade' amostras do canal a partir de 'inicio' em float32."""
+        trecho = np.asarray(self.dados[inicio:inicio + quantidade, canal])
+
+        if self.bytes_amostra == 3:
+            b = trecho.astype(np.int32)
+            valor = b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)
+            trecho = (valor << 8) >> 8  # extensão de sinal dos 24 bits
+
+        if self.dtype == np.float32:
+            return trecho
+        return trecho.astype(np.float32) * np.float32(self.escala)
+
+
+# Contêiner comprimido .vlfz (gravado por Modulos.Captura_Comprimida):
+#   "VLFZ" (4s), versão (H), tamanho do cabeçalho JSON (I), cabeçalho JSON,
+#   chunks comprimidos, índice (offset Q, tamanho I, tipo B por chunk),
+#   rodapé: offset do índice (Q) + "VLFZ"
+MAGIA_VLFZ = b"VLFZ"
+VERSAO_VLFZ = 1
+CABECALHO_VLFZ = struct.Struct("<4sHI")
+RODAPE_VLFZ = struct.Struct("<Q4s")
+DTYPE_INDICE_VLFZ = np.dtype([("offset", "<u8"), ("tamanho", "<u4"), ("tipo", "u1")])
+
+# Tipo de cada chunk: (dtype gravado, filtros, escala para float32)
+CHUNK_INT16 = 0       # int16 com delta; exato para capturas de 16 bits
+CHUNK_FLOAT32 = 1     # float32 original
+TIPOS_CHUNK_VLFZ = {
+    CHUNK_INT16: (np.dtype("<i2"), ("delta", "shuffle"), 1 / 32768),
+    CHUNK_FLOAT32: (np.dtype("<f4"), ("shuffle",), 1.0),
+}
+
+
+def desfazer_filtros(dados, dtype, forma, filtros):
+    """Inverte o embaralhamento de bytes e o delta aplicados na gravação."""
+    dtype = np.dtype(dtype)
+    bytes_ = np.frombuffer(dados, dtype=np.uint8)
+    if "shuffle" in filtros:
+        # Gravado como todos os 1ºs bytes, depois todos os 2ºs, ...
+        bytes_ = np.ascontiguousarray(bytes_.reshape(dtype.itemsize, -1).T)
+    x = bytes_.view(dtype).reshape(forma)
+    if "delta" in filtros:
+        x = np.cumsum(x, axis=0, dtype=dtype)  # inteiros: estouro circular, inverso exato
+    return x
+
+
+class FormatoComprimido:
+    """
+    Captura no contêiner .vlfz: chunks de duração fixa (1 minuto por
+    padrão) comprimidos de forma independente (zlib/lzma sobre int16 ou
+    float32 com delta e embaralhamento de bytes, tipo escolhido por
+    chunk), com índice de offsets.
+    Uma leitura vai direto aos chunks que cobrem o trecho; os chunks
+    seguintes já são descomprimidos em paralelo (zlib/lzma liberam o GIL).
+
+    Parâmetros:
+        caminho (str): Arquivo .vlfz.
+        paralelo (int): Chunks descomprimidos em paralelo (threads).
+    """
+
+    def __init__(self, caminho, paralelo=None):
+        with open(caminho, 'rb') as f:
+            magia, versao, tamanho = CABECALHO_VLFZ.unpack(f.read(CABECALHO_VLFZ.size))
+            if magia != MAGIA_VLFZ or versao != VERSAO_VLFZ:
+                raise ValueError(f"Contêiner .vlfz inválido: {caminho}")
+            self.cabecalho = json.loads(f.read(tamanho))
+
+            f.seek(-RODAPE_VLFZ.size, 2)
+            offset_indice, magia = RODAPE_VLFZ.unpack(f.read(RODAPE_VLFZ.size))
+            if magia != MAGIA_VLFZ:
+                raise ValueError(f"Contêiner .vlfz incompleto (sem índice): {caminho}")
+            f.seek(offset_indice)
+            n_chunks = self.cabecalho["chunks"]
+            self.indice = np.frombuffer(f.read(n_chunks * DTYPE_INDICE_VLFZ.itemsize),
+                                        dtype=DTYPE_INDICE_VLFZ)
+
+        self.Fs = self.cabecalho["Fs"]
+        self.canais = self.cabecalho["canais"]
+        self.total_amostras = self.cabecalho["total_amostras"]
+        self.amostras_chunk = self.cabecalho["amostras_por_chunk"]
+        self.descomprimir = lzma.decompress if self.cabecalho["compressor"] == "lzma" else zlib.decompress
+
+        self.bytes = np.memmap(caminho, dtype=np.uint8, mode='r')
+        self.paralelo = paralelo if paralelo else min(4, os.cpu_count() or 1)
+        self.pool = ThreadPoolExecutor(max_workers=self.paralelo)
+        self.futuros = {}
+        self.trava = threading.Lock()
+
+    def _descomprimir(self, c):
+        inicio = c * self.amostras_chunk
+        quadros = min(self.amostras_chunk, self.total_amostras - inicio)
+        entrada = self.indice[c]
+        dtype, filtros, escala = TIPOS_CHUNK_VLFZ[int(entrada["tipo"])]
+        dados = self.descomprimir(self.bytes[entrada["offset"]:entrada["offset"] + entrada["tamanho"]])
+        x = desfazer_filtros(dados, dtype, (quadros, self.canais), filtros)
+        if dtype != np.float32:
+            # Conversão na thread de descompressão (em paralelo)
+            x = x.astype(np.float32) * np.float32(escala)
+        x.flags.writeable = False  # leituras devolvem vistas do chunk em cache
+        return x
+
+    def _chunk(self, c):
+        with self.trava:
+            # Chunk pedido + os próximos em paralelo (leitura sequencial)
+            for j in range(c, min(c + self.paralelo, len(self.indice))):
+                if j not in self.futuros:
+                    self.futuros[j] = self.pool.submit(self._descomprimir, j)
+            futuro = self.futuros[c]
+            for j in [j for j in self.futuros if j < c - 1 or j >= c + 2 * self.paralelo]:
+                del self.futuros[j]
+        return futuro.result()
+
+    def ler(self, inicio, quantidade, canal=0):
+        """Retorna 'quantidade' amostras do canal a partir de 'inicio' em float32."""
+        fim = min(inicio + quantidade, self.total_amostras)
+        if fim <= inicio:
+            return np.zeros(0, dtype=np.float32)
+
+        A = self.amostras_chunk
+        partes = [self._chunk(c)[max(inicio - c * A, 0):fim - c * A, canal]
+                  for c in range(inicio // A, (fim - 1) // A + 1)]
+        return partes[0] if len(partes) == 1 else np.concatenate(partes)
+
+
+def abrir_formato(caminho, formato="auto", canais=1):
+    """
+    Seleciona o backend de leitura.
+
+    Parâmetros:
+        formato (str): "auto" (WAV pelo cabeçalho RIFF, .vlfz pela assinatura,
+                       senão float32 bruto), "float32", "int16", "wav", "vlfz";
+                       ou uma instância de backend.
+        canais (int): Canais intercalados dos formatos brutos (no WAV vem do
+                      cabeçalho).
+    """
+    if not isinstance(formato, str):
+        return formato
+
+    if formato == "auto":
+        with open(caminho, 'rb') as f:
+            assinatura = f.read(4)
+        formato = ("wav" if assinatura in (b'RIFF', b'RF64')
+                   else "vlfz" if assinatura == MAGIA_VLFZ else "float32")
+
+    if formato == "wav":
+        return FormatoWAV(caminho)
+    if formato == "vlfz":
+        return FormatoComprimido(caminho)
+    if formato == "float32":
+        return FormatoBruto(caminho, np.float32, canais=canais)
+    if formato == "int16":
+        return FormatoBruto(caminho, np.int16, escala=1 / 2**15, canais=canais)
+    raise ValueError(f"Formato de captura desconhecido: {formato}")
+
+# -----------------------------------------------------------------------------
+#  CLASSE DE LEITURA POR BLOCOS
+# -----------------------------------------------------------------------------
+
+class LeitorSinalVLF:
+    """
+    Leitor por blocos de capturas VLF. Os blocos são lidos do arquivo
+    mapeado em memória e convertidos para float32.
+
+    Parâmetros:
+        caminho (str): Arquivo da captura.
+        Fs (int): Taxa de amostragem (Hz); o cabeçalho do arquivo, se houver,
+                  tem prioridade.
+        tamanho_bloco (int): Amostras por bloco (padrão: 1 segundo).
+        bloco_inicial (int): Primeiro bloco lido; a leitura começa com seek
+                             direto para o byte correspondente.
+        total_blocos (int): Limita o número de blocos lidos (None = até o fim).
+        blocos_aquecimento (int): Blocos iniciais lidos apenas para aquecer
+                                  filtros/estado, descartados nas saídas.
+        formato: Formato da captura (ver abrir_formato).
+        canais (int): Canais intercalados de capturas brutas.
+        canal (int): Canal lido por este leitor (ver também o método canal).
+    """
+
+    def __init__(self, caminho, Fs=96000, tamanho_bloco=None,
+                 bloco_inicial=0, total_blocos=None, blocos_aquecimento=0,
+                 formato="auto", canais=1, canal=0):
+        self.caminho = caminho
+        self.formato = abrir_formato(caminho, formato, canais)
+        if not 0 <= canal < self.formato.canais:
+            raise ValueError(f"Canal {canal} inexistente (captura com {self.formato.canais} canais)")
+        self.indice_canal = canal
+
+        if self.formato.Fs and self.formato.Fs != Fs:
+            print(f"[AVISO] Taxa de amostragem do cabeçalho ({self.formato.Fs} Hz) "
+                  f"substitui a configurada ({Fs} Hz)")
+        self.Fs = self.formato.Fs or Fs
+        self.tamanho_bloco = tamanho_bloco if tamanho_bloco else self.Fs  # 1 segundo
+        self.total_amostras = self.formato.total_amostras
+        self.blocos_arquivo = self.total_amostras // self.tamanho_bloco
+
+        self.bloco_inicial = min(bloco_inicial, self.blocos_arquivo)
+        disponiveis = self.blocos_arquivo - self.bloco_inicial
+        self.total_blocos = disponiveis if total_blocos is None else min(total_blocos, disponiveis)
+        self.blocos_aquecimento = min(blocos_aquecimento, self.total_blocos)
+        print(f"Arquivo preparado: {self.total_amostras:,} amostras, {self.total_blocos:,} blocos")
+
+    @property
+    def tempo_inicial(self):
+        """Segundos desde o início da captura até o primeiro bloco útil."""
+        return (self.bloco_inicial + self.blocos_aquecimento) * self.tamanho_bloco / self.Fs
+
+    def canal(self, indice):
+        """
+        Leitor de outro canal da mesma captura intercalada. Compartilha o
+        mapeamento em memória e a janela; nenhum dado é copiado.
+        """
+        if not 0 <= indice < self.formato.canais:
+            raise ValueError(f"Canal {indice} inexistente (captura com {self.formato.canais} canais)")
+        leitor = copy.copy(self)
+        leitor.indice_canal = indice
+        return leitor
+
+    def __iter__(self):
+        return self.gerador_blocos()
+
+    def gerador_blocos(self):
+        for k in range(self.bloco_inicial, self.bloco_inicial + self.total_blocos):
+            yield self.formato.ler(k * self.tamanho_bloco, self.tamanho_bloco, self.indice_canal)
+
+# -----------------------------------------------------------------------------
+#  LEITURA ANTECIPADA (PREFETCH)
+# -----------------------------------------------------------------------------
+
+_FIM = object()
+
+
+class LeitorAntecipado:
+    """
+    Envolve um leitor de blocos e lê os próximos blocos em uma thread de
+    fundo enquanto o bloco atual é processado, sobrepondo E/S de disco e
+    demodulação.
+
+    Os blocos são copiados para buffers pré-alocados e reutilizados: o bloco
+    entregue só é válido até o pedido do próximo. Os demais atributos
+    (total_blocos, tamanho_bloco, caminho, ...) são os do leitor envolvido.
+
+    Parâmetros:
+        leitor: Iterável de blocos (ex.: LeitorSinalVLF).
+        profundidade (int): Blocos lidos à frente (1 = buffer duplo,
+                            2 = buffer triplo, ...).
+    """
+
+    def __init__(self, leitor, profundidade=2):
+        self.leitor = leitor
+        self.profundidade = max(1, int(profundidade))
+
+    def __getattr__(self, nome):
+        if nome == "leitor":
+            raise AttributeError(nome)
+        return getattr(self.leitor, nome)
+
+    def __iter__(self):
+        return self.gerador_blocos()
+
+    def gerador_blocos(self):
+        livres = queue.Queue()
+        prontos = queue.Queue()
+        parar = threading.Event()
+
+        # Um buffer por bloco adiantado + o que está com o consumidor;
+        # None = ainda não alocado (forma/dtype vêm do primeiro bloco)
+        for _ in range(self.profundidade + 1):
+            livres.put(None)
+
+        def produtor():
+            try:
+                for bloco in self.leitor:
+                    buffer = livres.get()
+                    if parar.is_set():
+                        return
+                    if buffer is None or buffer.shape != bloco.shape or buffer.dtype != bloco.dtype:
+                        buffer = np.empty(bloco.shape, dtype=bloco.dtype)
+                    np.copyto(buffer, bloco)
+                    prontos.put(buffer)
+                prontos.put(_FIM)
+            except BaseException as erro:
+                prontos.put(erro)
+
+        threading.Thread(target=produtor, daemon=True).start()
+
+        anterior = None
+        try:
+            while True:
+                # O bloco anterior já foi consumido: devolve o buffer ao produtor
+                if anterior is not None:
+                    livres.put(anterior)
+                    anterior = None
+
+                item = prontos.get()
+                if item is _FIM:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                anterior = item
+                yield item
+        finally:
+            parar.set()
+            livres.put(None)  # desbloqueia o produtor, se estiver esperando
+
+
+def antecipar(leitor, profundidade=2):
+    """
+    Retorna o leitor com leitura antecipada (profundidade > 0) ou o próprio
+    leitor (profundidade 0, None ou já antecipado).
+    """
+    if not profundidade or leitor is None or isinstance(leitor, LeitorAntecipado):
+        return leitor
+    return LeitorAntecipado(leitor, profundidade)
+
+# -----------------------------------------------------------------------------
+#  JANELA DE TEMPO UT
+# -----------------------------------------------------------------------------
+
+def janela_em_blocos(hora_inicial_UT, inicio_UT, fim_UT, duracao_bloco=1.0):
+    """
+    Converte uma janela em horas UT para o intervalo de blocos da captura.
+
+    Parâmetros:
+        hora_inicial_UT (float): Hora UT do início da captura (LT + H).
+        inicio_UT, fim_UT (float): Janela desejada em horas UT. Se fim <= início
+                                   a janela atravessa a meia-noite UT.
+        duracao_bloco (float): Duração de cada bloco (s).
+
+    Retorno:
+        (bloco_inicio, bloco_fim): blocos [início, fim) da janela.
+    """
+    # Arredonda ao microssegundo para não perder um bloco por erro de ponto flutuante
+    s_inicio = round(((inicio_UT - hora_inicial_UT) % 24) * 3600, 6)
+    s_fim = round(((fim_UT - hora_inicial_UT) % 24) * 3600, 6)
+    if s_fim <= s_inicio:
+        s_fim += 24 * 3600
+    return int(np.floor(s_inicio / duracao_bloco)), int(np.ceil(s_fim / duracao_bloco))
+
+
+def abrir_janela(caminho, Fs, bloco_inicio, bloco_fim, margem_s=60, tamanho_bloco=None,
+                 formato="auto", canais=1):
+    """
+    Abre um LeitorSinalVLF posicionado na janela [bloco_inicio, bloco_fim),
+    incluindo antes dela até 'margem_s' segundos de aquecimento. O tamanho
+    do bloco e a margem usam a taxa do cabeçalho da captura, se houver.
+    """
+    formato = abrir_formato(caminho, formato, canais)
+    Fs = formato.Fs or Fs
+    tamanho_bloco = tamanho_bloco if tamanho_bloco else Fs
+    aquecimento = min(bloco_inicio, int(np.ceil(margem_s * Fs / tamanho_bloco)))
+    return LeitorSinalVLF(
+        caminho, Fs=Fs, tamanho_bloco=tamanho_bloco,
+        bloco_inicial=bloco_inicio - aquecimento,
+        total_blocos=bloco_fim - bloco_inicio + aquecimento,
+        blocos_aquecimento=aquecimento,
+        formato=formato
+    )
 
 # -----------------------------------------------------------------------------
 #  SINCRONIZAÇÂO DAS AMOSTRAS DO ARQUIVO
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+Produtos online de fase e amplitude para o sistema ASTROMACK
+
+Desembrulha a fase de forma incremental e reduz a amplitude por RMS a cada
+intervalo (1 minuto por padrão), emitindo registros prontos enquanto a
+demodulação ainda está em andamento.
+"""
+
+import numpy as np
+from collections import namedtuple
+
+
+# Registro finalizado de um intervalo:
+#   tempo_UT     -> início do intervalo em horas UT
+#   amplitude_db -> amplitude RMS do intervalo em dB
+#   fase         -> amostras de fase (graus) desembrulhadas do intervalo
+#   flags        -> OU das flags de qualidade dos blocos do intervalo
+RegistroProduto = namedtuple("RegistroProduto", ["tempo_UT", "amplitude_db", "fase", "flags"],
+                             defaults=[0])
+
+
+# -----------------------------------------------------------------------------
+#  DESEMBRULHAMENTO INCREMENTAL DE FASE
+# -----------------------------------------------------------------------------
+
+class DesembrulhadorFase:
+    """
+    Equivalente incremental de np.unwrap: guarda o último valor embrulhado e o
+    deslocamento acumulado entre blocos, de modo que a concatenação das saídas
+    é igual ao np.unwrap do vetor completo. Amostras NaN (blocos descartados)
+    são mantidas como NaN e o desembrulhamento continua do último valor válido.
+    """
+
+    def __init__(self, periodo=2 * np.pi):
+        self.periodo = periodo
+        self.ultimo = None
+        self.deslocamento = 0.0
+
+    def processar(self, fase):
+        fase = np.asarray(fase, dtype=np.float64)
+        if fase.size == 0:
+            return fase
+
+        validos = np.isfinite(fase)
+        if not validos.all():
+            desembrulhada = np.full(fase.shape, np.nan)
+            desembrulhada[validos] = self.processar(fase[validos])
+            return desembrulhada
+
+        if self.ultimo is None:
+            desembrulhada = np.unwrap(fase, period=self.periodo)
+        else:
+            desembrulhada = np.unwrap(np.concatenate(([self.ultimo], fase)),
+                                      period=self.periodo)[1:]
+            desembrulhada += self.deslocamento
+
+        self.ultimo = fase[-1]
+        self.deslocamento = desembrulhada[-1] - fase[-1]
+        return desembrulhada
+
+
+# -----------------------------------------------------------------------------
+#  EMISSÃO DE REGISTROS POR INTERVALO
+# -----------------------------------------------------------------------------
+
+class ProdutosOnline:
+    """
+    Acumula a saída de cada bloco demodulado e emite um RegistroProduto a cada
+    'blocos_por_registro' blocos.
+
+    Parâmetros:
+        Fc (float): Frequência da portadora (Hz), usada na conversão da fase.
+        blocos_por_registro (int): Blocos por registro (60 blocos de 1 s = 1 min).
+        duracao_bloco (float): Duração de cada bloco (s).
+        tempo_inicial_UT (float): Hora UT do primeiro bloco.
+        epsilon (float): Valor mínimo da amplitude para evitar log de zero.
+        P_referencia (float): Potência de referência para dB.
+        ao_registrar (callable): Chamado com cada registro assim que fica pronto.
+    """
+
+    def __init__(self, Fc, blocos_por_registro=60, duracao_bloco=1.0,
+                 tempo_inicial_UT=0.0, epsilon=1e-6, P_referencia=5e-6,
+                 ao_registrar=None):
+        self.Fc = Fc
+        self.blocos_por_registro = blocos_por_registro
+        self.duracao_bloco = duracao_bloco
+        self.tempo_inicial_UT = tempo_inicial_UT
+        self.epsilon = epsilon
+        self.P_referencia = P_referencia
+        self.ao_registrar = ao_registrar
+
+        self.desembrulhador = DesembrulhadorFase()
+        self.blocos = 0
+        self._reiniciar_intervalo()
+
+    def _reiniciar_intervalo(self):
+        self.inicio_intervalo = self.blocos
+        self.soma_quadrados = 0.0
+        self.contagem = 0
+        self.fases = []
+        self.flags = 0
+
+    def adicionar_bloco(self, fase_esperada, amplitude, flags=0):
+        """
+        Acrescenta a saída de um bloco. Retorna o registro emitido ou None.
+        Blocos descartados entram com fase NaN (uma amostra por símbolo, o
+        que mantém o eixo de tempo da fase), amplitude vazia e suas flags.
+        """
+        self.flags |= int(flags)
+        fase = -self.desembrulhador.processar(fase_esperada) * 360 / self.Fc
+        self.fases.append(fase)
+
+        amplitude = np.asarray(amplitude, dtype=np.float64)
+        self.soma_quadrados += np.sum(amplitude**2)
+        self.contagem += amplitude.size
+
+        self.blocos += 1
+        if self.blocos - self.inicio_intervalo >= self.blocos_por_registro:
+            return self._emitir()
+        return None
+
+    def finalizar(self):
+        """
+        Emite o intervalo parcial restante, se houver. Retorna o registro ou None.
+        """
+        if self.blocos > self.inicio_intervalo:
+            return self._emitir()
+        return None
+
+    def _emitir(self):
+        if self.contagem:
+            rms = max(np.sqrt(self.soma_quadrados / self.contagem), self.epsilon)
+            amplitude_db = -20 * np.log10(rms / self.P_referencia)
+        else:
+            # Intervalo inteiro descartado: deixa o buraco visível
+            amplitude_db = np.nan
+
+        registro = RegistroProduto(
+            tempo_UT=self.tempo_inicial_UT + self.inicio_intervalo * self.duracao_bloco / 3600,
+            amplitude_db=amplitude_db,
+            fase=np.concatenate(self.fases) if self.fases else np.array([]),
+            flags=self.flags
+        )
+        self._reiniciar_intervalo()
+
+        if self.ao_registrar is not None:
+            self.ao_registrar(registro)
+        return registro
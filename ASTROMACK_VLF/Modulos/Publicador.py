@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+Publicador local dos produtos online (amplitude, fase e flags de qualidade)
+
+Cada RegistroProduto emitido durante a demodulação é enviado aos assinantes
+conectados por um socket TCP local ou Unix, em quadros binários compactos.
+Os registros são agrupados por uma janela de tempo curta para reduzir o
+número de envios. O envio roda em thread própria: um assinante lento ou
+desconectado nunca atrasa o laço de demodulação. A fila de envio é limitada;
+se os assinantes não acompanharem, os registros mais antigos são descartados.
+
+Formato do quadro (little-endian):
+    cabeçalho : magia "AVLF" (4s), versão (B), número de registros (I)
+    registro  : tempo_UT (d), amplitude_db (d), flags (B), n_fase (I),
+                seguido de n_fase amostras de fase (float32, graus)
+"""
+
+import os
+import queue
+import socket
+import struct
+import threading
+import time
+import numpy as np
+
+from .Produtos_Online import RegistroProduto
+
+
+MAGIA = b"AVLF"
+VERSAO = 1
+CABECALHO = struct.Struct("<4sBI")
+REGISTRO = struct.Struct("<ddBI")
+
+
+# -----------------------------------------------------------------------------
+#  CODIFICAÇÃO DOS QUADROS
+# -----------------------------------------------------------------------------
+
+def codificar_quadro(registros):
+    """Quadro binário com os registros agrupados."""
+    partes = [CABECALHO.pack(MAGIA, VERSAO, len(registros))]
+    for r in registros:
+        fase = np.asarray(r.fase, dtype="<f4")
+        partes.append(REGISTRO.pack(r.tempo_UT, r.amplitude_db, int(r.flags), fase.size))
+        partes.append(fase.tobytes())
+    return b"".join(partes)
+
+
+def _receber_exato(conexao, n):
+    dados = bytearray()
+    while len(dados) < n:
+        pedaco = conexao.recv(n - len(dados))
+        if not pedaco:
+            raise ConnectionError("Conexão encerrada pelo publicador")
+        dados.extend(pedaco)
+    return bytes(dados)
+
+
+def ler_quadro(conexao):
+    """Lê um quadro do socket e retorna a lista de RegistroProduto."""
+    magia, versao, n = CABECALHO.unpack(_receber_exato(conexao, CABECALHO.size))
+    if magia != MAGIA or versao != VERSAO:
+        raise ValueError(f"Quadro inválido (magia={magia!r}, versão={versao})")
+
+    registros = []
+    for _ in range(n):
+        tempo_UT, amplitude_db, flags, n_fase = REGISTRO.unpack(
+            _receber_exato(conexao, REGISTRO.size))
+        fase = np.frombuffer(_receber_exato(conexao, 4 * n_fase), dtype="<f4")
+        registros.append(RegistroProduto(tempo_UT, amplitude_db, fase, flags))
+    return registros
+
+
+# -----------------------------------------------------------------------------
+#  ENDEREÇOS
+# -----------------------------------------------------------------------------
+
+def _criar_socket(endereco):
+    """str = caminho de socket Unix; (host, porta) = TCP."""
+    if isinstance(endereco, str):
+        return socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    return socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+
+
+# -----------------------------------------------------------------------------
+#  PUBLICADOR
+# -----------------------------------------------------------------------------
+
+class PublicadorProdutos:
+    """
+    Servidor local que repassa os registros aos assinantes conectados.
+    Usado como (ou dentro do) callback 'ao_registrar' de ProdutosOnline.
+
+    Parâmetros:
+        endereco: (host, porta) para TCP ou caminho do socket Unix.
+        janela_s (float): Tempo máximo que um registro espera para ser agrupado.
+        max_registros (int): Registros por quadro que forçam o envio imediato.
+        max_fila (int): Registros aguardando envio; além disso o mais antigo
+                        é descartado.
+    """
+
+    def __init__(self, endereco=("127.0.0.1", 5760), janela_s=0.5, max_registros=64,
+                 max_fila=4096):
+        self.endereco = endereco
+        self.janela_s = janela_s
+        self.max_registros = max_registros
+        self.descartados = 0
+
+        if isinstance(endereco, str) and os.path.exists(endereco):
+            os.remove(endereco)  # socket Unix de uma execução anterior
+
+        self.servidor = _criar_socket(endereco)
+        if not isinstance(endereco, str):
+            self.servidor.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.servidor.bind(endereco)
+        self.servidor.listen()
+        self.servidor.settimeout(0.2)
+
+        self.assinantes = []
+        self.trava = threading.Lock()
+        self.fila = queue.Queue(maxsize=max_fila)
+        self.ativo = True
+
+        self.thread_aceite = threading.Thread(target=self._aceitar, daemon=True)
+        self.thread_envio = threading.Thread(target=self._enviar, daemon=True)
+        self.thread_aceite.start()
+        self.thread_envio.start()
+        print(f"[PUBLICADOR] Aguardando assinantes em {endereco}")
+
+    def __call__(self, registro):
+        self.publicar(registro)
+
+    def publicar(self, registro):
+        """Enfileira o registro para envio (não bloqueia; fila cheia descarta o mais antigo)."""
+        while True:
+            try:
+                self.fila.put_nowait(registro)
+                return
+            except queue.Full:
+                try:
+                    self.fila.get_nowait()
+                    self.descartados += 1
+                except queue.Empty:
+                    pass
+
+    def fechar(self):
+        """Envia os registros pendentes e encerra o servidor."""
+        if not self.ativo:
+            return
+        self.fila.put(None)  # bloqueia só até a thread de envio abrir espaço
+        self.thread_envio.join()
+        if self.descartados:
+            print(f"[PUBLICADOR] {self.descartados} registros descartados (fila cheia)")
+        self.ativo = False
+        self.thread_aceite.join()
+        self.servidor.close()
+        with self.trava:
+            for conexao in self.assinantes:
+                conexao.close()
+            self.assinantes.clear()
+        if isinstance(self.endereco, str) and os.path.exists(self.endereco):
+            os.remove(self.endereco)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.fechar()
+
+    def _aceitar(self):
+        while self.ativo:
+            try:
+                conexao, _ = self.servidor.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            conexao.settimeout(5.0)
+            with self.trava:
+                self.assinantes.append(conexao)
+
+    def _enviar(self):
+        pendentes = []
+        prazo = None
+        while True:
+            espera = None if prazo is None else max(prazo - time.monotonic(), 0)
+            try:
+                registro = self.fila.get(timeout=espera)
+            except queue.Empty:
+                registro = False  # janela de agrupamento esgotada
+
+            if registro is None:
+                self._transmitir(pendentes)
+                return
+            if registro is not False:
+                if not pendentes:
+                    prazo = time.monotonic() + self.janela_s
+                pendentes.append(registro)
+
+            if pendentes and (len(pendentes) >= self.max_registros
+                              or time.monotonic() >= prazo):
+                self._transmitir(pendentes)
+                pendentes = []
+                prazo = None
+
+    def _transmitir(self, registros):
+        if not registros:
+            return
+        quadro = codificar_quadro(registros)
+        # Envio fora da trava: a aceitação de novos assinantes não espera
+        with self.trava:
+            conexoes = list(self.assinantes)
+        for conexao in conexoes:
+            try:
+                conexao.sendall(quadro)
+            except OSError:
+                # Assinante caiu ou travou: descarta sem afetar os demais
+                conexao.close()
+                with self.trava:
+                    if conexao in self.assinantes:
+                        self.assinantes.remove(conexao)
+
+
+# -----------------------------------------------------------------------------
+#  ASSINANTE
+# -----------------------------------------------------------------------------
+
+def assinar(endereco=("127.0.0.1", 5760)):
+    """
+    Conecta ao publicador e gera os registros recebidos até a conexão
+    ser encerrada.
+    """
+    conexao = _criar_socket(endereco)
+    conexao.connect(endereco)
+    try:
+        while True:
+            try:
+                quadro = ler_quadro(conexao)
+            except ConnectionError:
+                return
+            yield from quadro
+    finally:
+        conexao.close()
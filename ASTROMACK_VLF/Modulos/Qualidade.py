@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+Índice de qualidade por bloco das capturas VLF
+
+Pré-varredura rápida que mede, para cada bloco, RMS, número de NaN, número
+de amostras saturadas e um índice de ruído impulsivo (curtose). O índice é
+gravado ao lado da captura para que o processamento principal possa pular
+ou mascarar blocos ruins e publicar as flags junto com os resultados.
+"""
+
+import os
+import numpy as np
+from tqdm import tqdm
+
+
+# -----------------------------------------------------------------------------
+#  FLAGS DE QUALIDADE (bits)
+# -----------------------------------------------------------------------------
+
+FLAG_NAN = 1          # Bloco contém NaN
+FLAG_SATURACAO = 2    # Amostras no limite da escala (clipping)
+FLAG_SILENCIO = 4     # Período morto (RMS ~ 0)
+FLAG_IMPULSIVO = 8    # Ruído impulsivo forte (tempestade de esféricos)
+
+# Blocos descartados por padrão: o demodulador não produz nada útil neles
+DESCARTE_PADRAO = FLAG_NAN | FLAG_SATURACAO | FLAG_SILENCIO
+
+DTYPE_QUALIDADE = np.dtype([
+    ("rms", np.float32),
+    ("nan", np.int32),
+    ("saturadas", np.int32),
+    ("curtose", np.float32),
+    ("flags", np.uint8),
+])
+
+
+# -----------------------------------------------------------------------------
+#  PRÉ-VARREDURA
+# -----------------------------------------------------------------------------
+
+def qualidade_bloco(bloco, limiar_saturacao=0.999):
+    """
+    Calcula (rms, nan, saturadas, curtose) de um único bloco.
+    """
+    nan = np.isnan(bloco)
+    n_nan = int(np.count_nonzero(nan))
+    x = bloco[~nan] if n_nan else bloco
+    x = x.astype(np.float64)
+
+    if x.size == 0:
+        return 0.0, n_nan, 0, 0.0
+
+    x2 = x * x
+    m2 = np.mean(x2)
+    curtose = np.mean(x2 * x2) / (m2 * m2) if m2 > 0 else 0.0
+    saturadas = int(np.count_nonzero(np.abs(x) >= limiar_saturacao))
+    return np.sqrt(m2), n_nan, saturadas, curtose
+
+
+def indice_qualidade(Sinal_VLF, limiar_saturacao=0.999, max_saturadas=10,
+                     limiar_silencio=1e-7, limiar_impulsivo=20.0):
+    """
+    Varre a captura e monta o índice de qualidade por bloco.
+
+    Parâmetros:
+        Sinal_VLF: iterador de blocos do sinal VLF (classe LeitorSinalVLF)
+        limiar_saturacao (float): |amostra| considerada saturada.
+        max_saturadas (int): Amostras saturadas toleradas por bloco.
+        limiar_silencio (float): RMS abaixo do qual o bloco é considerado morto.
+        limiar_impulsivo (float): Curtose acima da qual o bloco é impulsivo
+                                  (ruído gaussiano = 3).
+
+    Retorno:
+        ndarray estruturado (DTYPE_QUALIDADE) com um elemento por bloco.
+    """
+    indice = np.zeros(Sinal_VLF.total_blocos, dtype=DTYPE_QUALIDADE)
+
+    k = 0
+    for bloco in tqdm(Sinal_VLF, total=Sinal_VLF.total_blocos,
+                      desc="Índice de qualidade", unit="bloco"):
+        rms, n_nan, saturadas, curtose = qualidade_bloco(bloco, limiar_saturacao)
+
+        flags = 0
+        if n_nan:
+            flags |= FLAG_NAN
+        if saturadas > max_saturadas:
+            flags |= FLAG_SATURACAO
+        if rms < limiar_silencio:
+            flags |= FLAG_SILENCIO
+        if curtose > limiar_impulsivo:
+            flags |= FLAG_IMPULSIVO
+
+        indice[k] = (rms, n_nan, saturadas, curtose, flags)
+        k += 1
+
+    return indice[:k]
+
+
+def caminho_indice(caminho_captura, canal=0):
+    """Arquivo do índice, gravado ao lado da captura (um por canal)."""
+    if canal:
+        return caminho_captura + f".canal{canal}.qualidade.npy"
+    return caminho_captura + ".qualidade.npy"
+
+
+def carregar_ou_calcular_qualidade(Sinal_VLF, recalcular=False, **limiares):
+    """
+    Carrega o índice gravado ao lado da captura ou o calcula e grava.
+    O índice é refeito se a captura for mais nova que ele ou se o número de
+    blocos não bater.
+
+    O índice gravado cobre a captura inteira; o retorno fica alinhado com os
+    blocos do leitor. Um leitor por janela sem índice gravado varre só a
+    própria janela (sem gravar).
+    """
+    caminho = caminho_indice(Sinal_VLF.caminho, Sinal_VLF.indice_canal)
+    inicio = Sinal_VLF.bloco_inicial
+    fim = inicio + Sinal_VLF.total_blocos
+
+    if (not recalcular and os.path.exists(caminho)
+            and os.path.getmtime(caminho) >= os.path.getmtime(Sinal_VLF.caminho)):
+        indice = np.load(caminho)
+        if indice.dtype == DTYPE_QUALIDADE and len(indice) == Sinal_VLF.blocos_arquivo:
+            return indice[inicio:fim]
+
+    if inicio > 0 or fim < Sinal_VLF.blocos_arquivo:
+        return indice_qualidade(Sinal_VLF, **limiares)
+
+    indice = indice_qualidade(Sinal_VLF, **limiares)
+    np.save(caminho, indice)
+
+    ruins = np.count_nonzero(indice["flags"] & DESCARTE_PADRAO)
+    print(f"[QUALIDADE] {ruins:,} de {len(indice):,} blocos marcados para descarte")
+    return indice
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+Varredura de parâmetros do demodulador MSK com estágios compartilhados
+
+Várias configurações (modos Teste, cortes do passa-baixa, Fc/Rs candidatos)
+são demoduladas na mesma passagem pela captura. Os estágios formam um
+grafo em que prefixos iguais são calculados uma única vez por bloco:
+
+    leitura -> passa-alta (12 kHz) -> mistura (Fc, Rs, Teste) -> passa-baixa (corte)
+            -> integração e decisão (uma por configuração)
+
+A leitura, o passa-alta e a correção do GPS são comuns a todas; só os
+estágios que diferem são replicados.
+"""
+
+import itertools
+import numpy as np
+import scipy.signal as signal
+from tqdm import tqdm
+
+from .Demodulador_MSK2 import (filtro_passa_alta, filtro_passa_baixa, gerar_portadora_MSK_base,
+                               integrar_canal, decodificar_simbolos)
+from .Qualidade import DESCARTE_PADRAO
+from .Leitor_Sinal import antecipar
+
+
+# -----------------------------------------------------------------------------
+#  GRADE DE CONFIGURAÇÕES
+# -----------------------------------------------------------------------------
+
+PARAMETROS = ("Fc", "Rs", "Teste", "corte")
+
+
+def grade_parametros(**grade):
+    """
+    Produto cartesiano da grade. Cada valor pode ser escalar ou lista.
+    'corte' (passa-baixa, Hz) ausente = Rs, como em demodular_MSK2.
+
+    Ex.: grade_parametros(Fc=21400, Rs=200, Teste=[0, 1, 2, 3], corte=[150, 200])
+    """
+    desconhecidos = set(grade) - set(PARAMETROS)
+    if desconhecidos:
+        raise ValueError(f"Parâmetros de varredura desconhecidos: {sorted(desconhecidos)}")
+
+    listas = {nome: (valor if isinstance(valor, (list, tuple)) else [valor])
+              for nome, valor in grade.items()}
+    configuracoes = []
+    for valores in itertools.product(*listas.values()):
+        config = dict(zip(listas.keys(), valores))
+        config.setdefault("Teste", 1)
+        config.setdefault("corte", config["Rs"])
+        configuracoes.append(config)
+    return configuracoes
+
+
+def rotulo_configuracao(config):
+    """Rótulo para arquivos de saída, ex.: 'Fc21400_Rs200_Teste1_corte200'."""
+    return "_".join(f"{nome}{config[nome]:g}" for nome in PARAMETROS)
+
+
+# -----------------------------------------------------------------------------
+#  GRAFO DE ESTÁGIOS
+# -----------------------------------------------------------------------------
+
+class GrafoVarredura:
+    """
+    Estágios deduplicados de uma lista de configurações para blocos de
+    Fs amostras. Portadoras (sem GPS) e coeficientes de filtro são
+    calculados uma vez para toda a captura.
+    """
+
+    def __init__(self, configuracoes, Fs, tamanho_bloco):
+        self.configuracoes = configuracoes
+        self.Fs = Fs
+        self.tamanho_bloco = tamanho_bloco
+
+        # Prefixos distintos de cada estágio
+        self.misturas = sorted({(c["Fc"], c["Rs"], c["Teste"]) for c in configuracoes})
+        self.passa_baixas = sorted({(c["Fc"], c["Rs"], c["Teste"], c["corte"]) for c in configuracoes})
+
+        self.b_hp, self.a_hp = filtro_passa_alta(12000, Fs)
+        self.coeficientes_lp = {corte: filtro_passa_baixa(corte, Fs)
+                                for corte in {c["corte"] for c in configuracoes}}
+        self.portadoras = {}
+
+        print(f"[VARREDURA] {len(configuracoes)} configurações: 1 leitura, 1 passa-alta, "
+              f"{len(self.misturas)} misturas, {len(self.passa_baixas)} passa-baixas")
+
+    def _portadoras(self, chave, n, correcao):
+        Fc, Rs, Teste = chave
+        if correcao is not None:
+            return gerar_portadora_MSK_base(self.Fs, Fc, Rs, n, fase=correcao, Teste=Teste)
+        if (chave, n) not in self.portadoras:
+            self.portadoras[(chave, n)] = gerar_portadora_MSK_base(self.Fs, Fc, Rs, n, Teste=Teste)
+        return self.portadoras[(chave, n)]
+
+    def processar(self, bloco, correcao=None, extrair_ascii=False):
+        """
+        Demodula o bloco em todas as configurações.
+
+        Retorno:
+            lista (na ordem das configurações) com a saída de demodular_MSK2
+        """
+        filtrado = signal.filtfilt(self.b_hp, self.a_hp, bloco)
+
+        misturados = {}
+        for chave in self.misturas:
+            portadora_sin, portadora_cos = self._portadoras(chave, len(bloco), correcao)
+            misturados[chave] = (filtrado * portadora_sin, filtrado * portadora_cos)
+
+        filtrados = {}
+        for chave in self.passa_baixas:
+            b_lp, a_lp = self.coeficientes_lp[chave[3]]
+            sinal_I, sinal_Q = misturados[chave[:3]]
+            filtrados[chave] = (2 * signal.filtfilt(b_lp, a_lp, sinal_I),
+                                2 * signal.filtfilt(b_lp, a_lp, sinal_Q))
+
+        saidas = []
+        for c in self.configuracoes:
+            I_filtrado, Q_filtrado = filtrados[(c["Fc"], c["Rs"], c["Teste"], c["corte"])]
+            N_bit = int(self.Fs * (1 / (c["Rs"] * 2)))
+            simbolos_I = integrar_canal(I_filtrado, N_bit, start=0)
+            simbolos_Q = integrar_canal(Q_filtrado, N_bit, start=1)
+            saidas.append(decodificar_simbolos(simbolos_I, simbolos_Q, extrair_ascii=extrair_ascii))
+        return saidas
+
+
+# -----------------------------------------------------------------------------
+#  LAÇO PRINCIPAL DA VARREDURA
+# -----------------------------------------------------------------------------
+
+def main_varredura(Sinal_VLF, Sinal_GPS, Taxa_de_amostragem, configuracoes, produtos=None,
+                   qualidade=None, mascara_descarte=DESCARTE_PADRAO, antecipacao=2):
+    """
+    Equivalente de main_DMSK para várias configurações numa só passagem.
+
+    Parâmetros:
+        Sinal_VLF: iterador de blocos do sinal VLF (classe LeitorSinalVLF)
+        Sinal_GPS: iterador do sinal GPS (ou None)
+        Taxa_de_amostragem: taxa de amostragem do sinal (Hz)
+        configuracoes: lista de dicionários (ver grade_parametros)
+        produtos: dicionário rótulo -> ProdutosOnline (opcional)
+        qualidade: índice de qualidade por bloco (Modulos.Qualidade) ou None
+        mascara_descarte: flags de qualidade que fazem o bloco ser pulado
+        antecipacao: blocos lidos à frente em thread de fundo
+
+    Retorno:
+        dicionário rótulo -> {"config", "FE", "FI", "bits", "Amp"}
+    """
+    Sinal_VLF = antecipar(Sinal_VLF, antecipacao)
+    Sinal_GPS = antecipar(Sinal_GPS, antecipacao)
+
+    grafo = GrafoVarredura(configuracoes, Taxa_de_amostragem, Sinal_VLF.tamanho_bloco)
+    rotulos = [rotulo_configuracao(c) for c in configuracoes]
+    produtos = produtos or {}
+    resultados = {r: {"config": c, "FE": [], "FI": [], "bits": [], "Amp": []}
+                  for r, c in zip(rotulos, configuracoes)}
+
+    flags = qualidade["flags"] if qualidade is not None else np.zeros(0, dtype=np.uint8)
+    aquecimento = getattr(Sinal_VLF, "blocos_aquecimento", 0)
+
+    if Sinal_GPS is None:
+        pares = ((bloco, None) for bloco in Sinal_VLF)
+        total = Sinal_VLF.total_blocos
+    else:
+        from .Leitor_Sinal import Sincro_Amostras, comparador_de_fase_complexo, pll_sine_gen
+        pares = zip(Sinal_VLF, Sinal_GPS)
+        total = min(Sinal_VLF.total_blocos, Sinal_GPS.total_blocos)
+
+    for k, (bloco, bloco_GPS) in enumerate(tqdm(pares, total=total, desc="Varredura", unit="bloco")):
+        flag = flags[k] if k < len(flags) else 0
+        if flag & mascara_descarte:
+            if k >= aquecimento:
+                # Fase NaN com o número de símbolos de um bloco demodulado
+                for rotulo, c in zip(rotulos, configuracoes):
+                    vazio = np.full(len(bloco) // int(Taxa_de_amostragem / (2 * c["Rs"])) - 1, np.nan)
+                    resultados[rotulo]["FE"].extend(vazio)
+                    resultados[rotulo]["FI"].extend(vazio)
+                    resultados[rotulo]["Amp"].extend(vazio)
+                    if rotulo in produtos:
+                        produtos[rotulo].adicionar_bloco(vazio, [], flag)
+            continue
+
+        # Correção do GPS: calculada uma vez e compartilhada
+        correcao = None
+        if bloco_GPS is not None:
+            GPS_senoidal = pll_sine_gen(bloco_GPS, Taxa_de_amostragem)
+            Senoide_Amostra = Sincro_Amostras(Taxa_de_amostragem, len(bloco_GPS))
+            _, Correcao_GPS_rad = comparador_de_fase_complexo(GPS_senoidal, Senoide_Amostra)
+            correcao = np.nan_to_num(Correcao_GPS_rad, nan=0.0)
+
+        saidas = grafo.processar(np.nan_to_num(bloco, nan=0.0), correcao)
+        if k < aquecimento:
+            continue
+
+        for rotulo, (bits, _, fase_esperada, fase_integrada, Ampli, _, _) in zip(rotulos, saidas):
+            resultado = resultados[rotulo]
+            resultado["FE"].extend(fase_esperada)
+            resultado["FI"].extend(fase_integrada)
+            resultado["bits"].extend(bits)
+            resultado["Amp"].extend(Ampli)
+            if rotulo in produtos:
+                produtos[rotulo].adicionar_bloco(fase_esperada, Ampli, flag)
+
+    for rotulo in rotulos:
+        if rotulo in produtos:
+            produtos[rotulo].finalizar()
+        for nome in ("FE", "FI", "bits", "Amp"):
+            resultados[rotulo][nome] = np.array(resultados[rotulo][nome])
+
+    return resultados
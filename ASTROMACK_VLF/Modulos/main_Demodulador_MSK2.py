@@ -1,8 +1,13 @@
 from tqdm import tqdm
 import numpy as np
-from .Demodulador_MSK2 import demodular_MSK2
+from .Demodulador_MSK2 import demodular_MSK2, SincronizadorSimbolos, DemoduladorLote
+from .Banda_Base import demodular_MSK_banda_base
+from .Qualidade import DESCARTE_PADRAO
+from .Leitor_Sinal import antecipar
 
-def main_DMSK(Sinal_VLF, Sinal_GPS, Taxa_de_amostragem, Rs, Fc, Teste=1):
+def main_DMSK(Sinal_VLF, Sinal_GPS, Taxa_de_amostragem, Rs, Fc, Teste=1, produtos=None,
+              qualidade=None, mascara_descarte=DESCARTE_PADRAO, antecipacao=2,
+              sincronismo=False, lote=1):
     """
     Função principal de demodulação MSK para leitura de fase e amplitude.
 
@@ -13,6 +18,21 @@ def main_DMSK(Sinal_VLF, Sinal_GPS, Taxa_de_amostragem, Rs, Fc, Teste=1):
         Rs: taxa de símbolos (baud)
         Fc: frequência da portadora (Hz)
         Teste: modo de teste (1 = padrão)
+        produtos: instância de ProdutosOnline que recebe cada bloco demodulado
+                  e emite os registros de fase/amplitude durante o processamento
+        qualidade: índice de qualidade por bloco (Modulos.Qualidade) ou None
+        mascara_descarte: flags de qualidade que fazem o bloco ser pulado
+        antecipacao: blocos lidos à frente em thread de fundo (0 = leitura síncrona)
+        sincronismo: sincronismo de símbolo contínuo entre blocos (Gardner);
+                     não perde símbolos nas bordas e aceita blocos de qualquer tamanho
+        lote: blocos demodulados juntos em uma matriz (K, N) (1 = bloco a bloco;
+              ignorado com sincronismo, que depende do bloco anterior)
+
+    Sinal_VLF pode ser um LeitorBandaBase (arquivo IQ decimado): os blocos
+    vão para demodular_MSK_banda_base, sem lote nem sincronismo.
+
+    Os primeiros Sinal_VLF.blocos_aquecimento blocos (leitura por janela) são
+    processados apenas para aquecer o estado e não entram nas saídas.
 
     Retorno:
         FE: fase esperada (referência)
@@ -21,58 +41,140 @@ def main_DMSK(Sinal_VLF, Sinal_GPS, Taxa_de_amostragem, Rs, Fc, Teste=1):
         ASCII2: sequência ASCII detectada (opcional)
         Amp: vetor de amplitude por bloco
     """
+    # Leitura antecipada: o disco trabalha enquanto o bloco atual é demodulado
+    Sinal_VLF = antecipar(Sinal_VLF, antecipacao)
+    Sinal_GPS = antecipar(Sinal_GPS, antecipacao)
+
     FE = []
     FI = []
     Amp = []
     bitss = []
     ASCII2 = []
 
-    if Sinal_GPS is None:
-        for bloco in tqdm(Sinal_VLF, total=Sinal_VLF.total_blocos, desc="Demodulando blocos", unit="bloco"):
-            bits, ASCII_orig, fase_esperada, fase_integrada, Ampli, _, _ = demodular_MSK2(
-                np.nan_to_num(bloco, nan=0.0),
-                None,
-                Fs=Taxa_de_amostragem,
+    flags = qualidade["flags"] if qualidade is not None else np.zeros(0, dtype=np.uint8)
+    aquecimento = getattr(Sinal_VLF, "blocos_aquecimento", 0)
+    GPS = Sinal_GPS is not None
+    banda_base = getattr(Sinal_VLF, "banda_base", False)
+    sincronismo = sincronismo and not banda_base
+    sincronizador = SincronizadorSimbolos(int(Taxa_de_amostragem / (2 * Rs))) if sincronismo else None
+    N_bit = int((Sinal_VLF.Fs if banda_base else Taxa_de_amostragem) / (2 * Rs))
+
+    def descartar(k, n_amostras):
+        """
+        Pula o bloco marcado: entra com fase NaN (uma amostra por símbolo,
+        como um bloco demodulado) para o eixo de tempo não se deslocar, e
+        repassa suas flags aos produtos.
+        """
+        if k < len(flags) and flags[k] & mascara_descarte:
+            esvaziar_lote()  # blocos bons anteriores chegam antes do descartado
+            if k >= aquecimento:
+                vazio = np.full(n_amostras // N_bit - (0 if sincronismo else 1), np.nan)
+                FE.extend(vazio)
+                FI.extend(vazio)
+                Amp.extend(vazio)
+                if produtos is not None:
+                    produtos.adicionar_bloco(vazio, [], flags[k])
+            if sincronizador is not None:
+                sincronizador.pular(n_amostras)
+            return True
+        return False
+
+    def flag_bloco(k):
+        return flags[k] if k < len(flags) else 0
+
+    def entregar(k, bits, ASCII_orig, fase_esperada, fase_integrada, Ampli):
+        """Acumula a saída do bloco k (fora do aquecimento) e alimenta os produtos."""
+        if k < aquecimento:
+            return
+        ASCII2.extend(ASCII_orig)
+        Amp.extend(Ampli)
+        FE.extend(fase_esperada)
+        FI.extend(fase_integrada)
+        bitss.extend(bits)
+        if produtos is not None:
+            produtos.adicionar_bloco(fase_esperada, Ampli, flag_bloco(k))
+
+    # Modo em lote: K blocos de mesmo tamanho por chamada
+    lote = 1 if (sincronismo or banda_base) else max(int(lote), 1)
+    demodulador = (DemoduladorLote(Taxa_de_amostragem, Rs, Fc, Sinal_VLF.tamanho_bloco,
+                                   lote=lote, Teste=Teste) if lote > 1 else None)
+    pendentes = []  # (k, bloco, correção GPS)
+
+    def esvaziar_lote():
+        if not pendentes:
+            return
+        blocos = np.stack([bloco for _, bloco, _ in pendentes])
+        correcoes = np.stack([c for _, _, c in pendentes]) if GPS else None
+        saidas = demodulador.processar(blocos, correcoes, extrair_ascii=True)
+        bits, ASCII_orig, fase_esperada, fase_integrada, Ampli = saidas[:5]
+        for i, (k, _, _) in enumerate(pendentes):
+            entregar(k, bits[i], ASCII_orig[i], fase_esperada[i], fase_integrada[i], Ampli[i])
+        pendentes.clear()
+
+    def demodular_bloco(k, bloco, correcao):
+        # nan_to_num copia o bloco: o leitor antecipado reaproveita o buffer original
+        bloco = np.nan_to_num(bloco, nan=0.0)
+        if demodulador is not None and len(bloco) == demodulador.tamanho_bloco:
+            pendentes.append((k, bloco, correcao))
+            if len(pendentes) == lote:
+                esvaziar_lote()
+            return
+
+        esvaziar_lote()  # mantém a ordem dos blocos (ex.: último bloco parcial)
+        if banda_base:
+            # Correção do GPS (taxa da captura) levada à taxa da banda base
+            bits, ASCII_orig, fase_esperada, fase_integrada, Ampli, _, _ = demodular_MSK_banda_base(
+                bloco,
+                correcao[::Sinal_VLF.decimacao] if GPS else None,
+                Fs=Sinal_VLF.Fs,
                 Rs=Rs,
-                Fc=Fc,
-                GPS=False,
+                GPS=GPS,
                 extrair_ascii=True,
                 Teste=Teste
             )
-            ASCII2.extend(ASCII_orig)
-            Amp.extend(Ampli)
-            FE.extend(fase_esperada)
-            FI.extend(fase_integrada)
-            bitss.extend(bits)
+            entregar(k, bits, ASCII_orig, fase_esperada, fase_integrada, Ampli)
+            return
+
+        bits, ASCII_orig, fase_esperada, fase_integrada, Ampli, _, _ = demodular_MSK2(
+            bloco,
+            correcao,
+            Fs=Taxa_de_amostragem,
+            Rs=Rs,
+            Fc=Fc,
+            GPS=GPS,
+            extrair_ascii=True,
+            Teste=Teste,
+            sincronizador=sincronizador
+        )
+        entregar(k, bits, ASCII_orig, fase_esperada, fase_integrada, Ampli)
+
+    if not GPS:
+        for k, bloco in enumerate(tqdm(Sinal_VLF, total=Sinal_VLF.total_blocos, desc="Demodulando blocos", unit="bloco")):
+            if descartar(k, len(bloco)):
+                continue
+            demodular_bloco(k, bloco, None)
 
     else:
         from .Leitor_Sinal import Sincro_Amostras, comparador_de_fase_complexo, pll_sine_gen
 
 
-        for bloco_VLF, bloco_GPS in tqdm(
+        for k, (bloco_VLF, bloco_GPS) in enumerate(tqdm(
             zip(Sinal_VLF, Sinal_GPS),
             total=min(Sinal_VLF.total_blocos, Sinal_GPS.total_blocos),
             desc="Demodulando com GPS", unit="bloco"
-        ):
+        )):
+            if descartar(k, len(bloco_VLF)):
+                continue
+
             GPS_senoidal = pll_sine_gen(bloco_GPS, Taxa_de_amostragem)
             Senoide_Amostra = Sincro_Amostras(Taxa_de_amostragem, len(bloco_GPS))
             _, Correcao_GPS_rad = comparador_de_fase_complexo(GPS_senoidal, Senoide_Amostra)
 
-            bits, ASCII_orig, fase_esperada, fase_integrada, Ampli, _, _ = demodular_MSK2(
-                np.nan_to_num(bloco_VLF, nan=0.0),
-                np.nan_to_num(Correcao_GPS_rad, nan=0.0),
-                Fs=Taxa_de_amostragem,
-                Rs=Rs,
-                Fc=Fc,
-                GPS=True,
-                extrair_ascii=True,
-                Teste=Teste
-            )
-            ASCII2.extend(ASCII_orig)
-            Amp.extend(Ampli)
-            FE.extend(fase_esperada)
-            FI.extend(fase_integrada)
-            bitss.extend(bits)
+            demodular_bloco(k, bloco_VLF, np.nan_to_num(Correcao_GPS_rad, nan=0.0))
+
+    esvaziar_lote()
+    if produtos is not None:
+        produtos.finalizar()
 
     # Conversão final para arrays
-    return np.array(FE), np.array(FI), bitss, np.int32(ASCII2), Amp
+    return np.array(FE), np.array(FI), bitss, np.int32(ASCII2), Amp
\ No newline at end of file
@@ -16,7 +16,20 @@ import os
 
 from Modulos.main_Demodulador_MSK2 import main_DMSK
 from Modulos.Amplitude import Amplitude_Direta
-from Modulos.Gravacao import salvar_txt, salvar_bin, salvar_fits, gerar_header_fits
+from Modulos.Gravacao import (salvar_txt_rapido, salvar_bin, salvar_fits, gerar_header_fits,
+                              formato_tempo_UT, decimar_serie)
+from Modulos.Produtos_Online import ProdutosOnline
+from Modulos.Estimador_Portadora import main_Estimador
+from Modulos.Qualidade import carregar_ou_calcular_qualidade
+from Modulos.Leitor_Sinal import LeitorSinalVLF, janela_em_blocos, abrir_janela, abrir_formato
+from Modulos.Cache_Estagios import (CacheEstagios, GravadorBlocos, chave_estagio, em_cache,
+                                    identidade_captura, reproduzir_blocos, versao_codigo)
+from Modulos.Arquivo_Multidias import ArquivoMultidias
+from Modulos.Publicador import PublicadorProdutos
+from Modulos.Banda_Base import LeitorBandaBase, garantir_banda_base
+from Modulos.Varredura import main_varredura, grade_parametros, rotulo_configuracao
+from Modulos.Espectrograma import main_espectrograma
+from Modulos import Amplitude, Banda_Base, Demodulador_MSK2, Leitor_Sinal, Qualidade, main_Demodulador_MSK2
 
 
 
@@ -91,26 +104,106 @@ Nome_da_pasta = f'Captura dia {Data}'
 Nome_do_arquivo_VLF = f'Captura {Data} 0h00 AM.mat' #Nome da captura Audacity
 Nome_do_arquivo_GPS = None  # ou "GPS_simulado10-01-2025.bin"
 
+# Captura com canais intercalados (ex.: antena VLF + 1PPS do GPS na placa de som)
+Canais_captura = None       # ou {"VLF": 0, "GPS": 1}
+Numero_de_canais = 1        # Canais intercalados em capturas brutas (WAV: cabeçalho)
+GPS_intercalado = Canais_captura is not None and "GPS" in Canais_captura
+
 # Parâmetros do sinal
 Rs = 200                  # Taxa de símbolos (baud)
 Rb = 2 * Rs               # Taxa de bits
 Fc = 21400               # Frequência da portadora (Hz)
-Taxa_de_amostragem = 96000  # Hz
+Taxa_de_amostragem = 96000  # Hz (WAV: usa a taxa do cabeçalho)
+Teste = 1                   # Modo de teste do demodulador (0-3)
+Sincronismo_continuo = False  # Sincronismo de símbolo contínuo entre blocos (Gardner)
+Lote_demodulacao = 16       # Blocos demodulados por chamada (matriz K x N; 1 = bloco a bloco)
+Usar_banda_base = False     # Demodula do arquivo IQ decimado em torno de Fc (Teste 0/1)
+Decimacao_banda_base = 80   # 96 kHz / 80 = 1200 amostras IQ por segundo
+
+# Varredura de parâmetros: demodula todas as combinações numa só passagem e encerra
+Varredura = None            # Ex.: {"Teste": [0, 1, 2, 3], "corte": [150, 200]} (Fc/Rs: os de cima)
+Formato_captura = "auto"    # "auto", "float32", "int16", "wav" (PCM16/24/float) ou "vlfz" (comprimido)
 
 # Flags de controle
 simulacao = True
 Amplitude_antes = False
+Modo_rapido = False       # Apenas amplitude/fase da portadora (1 s), sem bits
+Usar_qualidade = True     # Pré-varredura de qualidade: pula blocos ruins e gera flags
+
+# Quicklook espectral: espectrograma por minuto e potência na banda de cada portadora
+Quicklook_espectral = False
+Portadoras_quicklook = {f"{Fc / 1000:g} kHz": Fc}  # Ex.: {"NPM": 21400, "NAA": 24000, "NLK": 24800}
+
+# Cache das saídas intermediárias (refaz só os estágios cujas entradas mudaram)
+Usar_cache = True
+Orcamento_cache_GB = 20
+Checksum_captura = None   # None, "parcial" ou "completo"
+
+# Janela de processamento (horas UT). None = captura inteira
+Janela_UT = None          # Ex.: (8.5, 9.5) para o terminador do nascer do Sol
+Margem_aquecimento = 60   # Segundos lidos antes da janela para aquecer filtros
+
+# Parâmetros da amplitude (RMS por intervalo)
+epsilon = 1e-6
+P_referencia = 5e-6
+suavisacao = 60           # Blocos de 1 s por registro (1 minuto)
+
+# Arquivo multidias (grade UT comum) e curva de dia calmo (QDC)
+Usar_arquivo_multidias = True
+Resolucao_arquivo_s = 60  # Passo da grade UT do arquivo
+Janela_QDC_dias = 15      # Dias anteriores usados na QDC
+
+# Exportação TXT (backup)
+Compactar_txt = False         # Grava .txt.gz
+Cadencia_fase_txt_s = None    # Ex.: 1 = média da fase a cada 1 s; None = todas as amostras
+Formato_valores_txt = "%.10f"  # Amplitude/fase (o tempo usa só as casas que o passo exige)
+
+# Publicação dos registros ao vivo (painéis/alertas: python -m Modulos.Assinante_Teste)
+Publicar_produtos = False
+Endereco_publicacao = ("127.0.0.1", 5760)  # ou caminho de socket Unix
 
 # Normalização da hora (mesmo depois da captura):
 H = -obter_diferenca_UTC(Data, Hora_de_inicio_da_captura, zona='America/Sao_Paulo')
+hh, mm = Hora_de_inicio_da_captura.split(":")
+Hora_inicial_UT = int(hh) + int(mm) / 60 + H
+
+# Blocos (1 s) da janela na captura e hora UT absoluta do primeiro bloco útil
+if Janela_UT is not None:
+    Bloco_inicio, Bloco_fim = janela_em_blocos(Hora_inicial_UT, *Janela_UT)
+else:
+    Bloco_inicio, Bloco_fim = 0, None
+Hora_inicial_janela_UT = Hora_inicial_UT + Bloco_inicio / 3600
+
+# =============================================================================
+# DEFINIÇÃO DE CAMINHOS
+# =============================================================================
+
+diretorio_atual = os.getcwd()
+diretorio_de_entrada = os.path.join(diretorio_atual, 'Capturas', Nome_da_pasta)
+diretorio_de_pre_processamento = os.path.join(diretorio_atual, 'Pré-processamento')
+diretorio_de_resultados = os.path.join(diretorio_atual, 'Resultado final')
+
+caminho_do_arquivo_VLF = os.path.join(diretorio_de_entrada, Nome_do_arquivo_VLF)
+
+# Taxa de amostragem efetiva: o cabeçalho da captura (WAV/.vlfz), se houver,
+# tem prioridade sobre a configurada e vale para todos os estágios
+Taxa_de_amostragem = (abrir_formato(caminho_do_arquivo_VLF, Formato_captura, Numero_de_canais).Fs
+                      or Taxa_de_amostragem)
 
 # Parâmetros dos dados
 data_obs=Data.replace("-", "-")     # já está no formato ISO
 station= "ROPK"
 local = "-23.185230, -46.558557"
-metodo_fase="Demodulacao com |Fc|"
-metodo_amp="Direta" if Amplitude_antes else "RMS + suavizacao"
-gps="Simulado" if simulacao else ("Nenhum" if Nome_do_arquivo_GPS is None else "Real")
+metodo_fase="Raias 2(Fc +- Rs/2)" if Modo_rapido else ("Demodulacao em banda base (IQ decimado)" if Usar_banda_base else "Demodulacao com |Fc|")
+metodo_amp="Raias 2(Fc +- Rs/2)" if Modo_rapido else ("Direta" if Amplitude_antes else "RMS + suavizacao")
+# Modo rápido: escala e referência diferentes (raias da portadora), por isso
+# os produtos vão para arquivos próprios e não se misturam com os demais
+Sufixo_saida = "Rapido_" if Modo_rapido else ""
+# Método no nome do arquivo multidias: dias de métodos diferentes não se misturam
+Metodo_arquivo = "Rapido" if Modo_rapido else "_".join(
+    (["BandaBase"] if Usar_banda_base else []) + [f"Teste{Teste}"]
+    + (["Direta"] if Amplitude_antes else []))
+gps="Simulado" if simulacao else ("Real" if Nome_do_arquivo_GPS is not None or GPS_intercalado else "Nenhum")
 
 # Cabeçario dos dados de amplitude
 header_amp = gerar_header_fits(
@@ -138,70 +231,106 @@ header_fase = gerar_header_fits(
     gps=gps
 )
 
-# =============================================================================
-# DEFINIÇÃO DE CAMINHOS
-# =============================================================================
-
-diretorio_atual = os.getcwd()
-diretorio_de_entrada = os.path.join(diretorio_atual, 'Capturas', Nome_da_pasta)
-diretorio_de_pre_processamento = os.path.join(diretorio_atual, 'Pré-processamento')
-diretorio_de_resultados = os.path.join(diretorio_atual, 'Resultado final')
-
-caminho_do_arquivo_VLF = os.path.join(diretorio_de_entrada, Nome_do_arquivo_VLF)
-
-# =============================================================================
-# CLASSE DE LEITURA POR BLOCOS
-# =============================================================================
-
-class LeitorSinalVLF:
-    def __init__(self, caminho, Fs=96000, tamanho_bloco=None):
-        self.caminho = caminho
-        self.Fs = Fs
-        self.tamanho_bloco = tamanho_bloco if tamanho_bloco else Fs  # 1 segundo
-        self.total_amostras = int(np.fromfile(caminho, dtype=np.float32).size)
-        self.total_blocos = self.total_amostras // self.tamanho_bloco
-        print(f"Arquivo preparado: {self.total_amostras:,} amostras, {self.total_blocos:,} blocos")
-
-    def __iter__(self):
-        return self.gerador_blocos()
-
-    def gerador_blocos(self):
-        with open(self.caminho, 'rb') as f:
-            for _ in range(self.total_blocos):
-                bloco = np.fromfile(f, dtype=np.float32, count=self.tamanho_bloco)
-                if bloco.size < self.tamanho_bloco:
-                    break
-                yield bloco
-
 # =============================================================================
 # LEITURA E PROCESSAMENTO DO SINAL VLF
 # =============================================================================
 
-if Nome_do_arquivo_GPS is None and not simulacao:
-    Sinal_VLF = LeitorSinalVLF(caminho_do_arquivo_VLF, Fs=Taxa_de_amostragem)
-
-    if Amplitude_antes:
-        Amplitude_db = np.array(Amplitude_Direta(Sinal_VLF, Taxa_de_amostragem, Rs, Fc))
-        salvar_bin(Amplitude_db, diretorio_de_pre_processamento, f"Amplitude_db_Direta_{Data}")
-        FE_DK2, FI_DK2, *_ = main_DMSK(Sinal_VLF, None, Taxa_de_amostragem, Rs, Fc)
-    else:
-        FE_DK2, FI_DK2, _, _, Amp = main_DMSK(Sinal_VLF, None, Taxa_de_amostragem, Rs, Fc)
-        Amp = np.array(Amp)
-
-elif Nome_do_arquivo_GPS is not None and not simulacao:
-    Sinal_VLF = LeitorSinalVLF(caminho_do_arquivo_VLF, Fs=Taxa_de_amostragem)
-    caminho_do_arquivo_GPS = os.path.join(diretorio_de_entrada, Nome_do_arquivo_GPS)
-    Sinal_GPS = LeitorSinalVLF(caminho_do_arquivo_GPS, Fs=Taxa_de_amostragem)
-
-    if Amplitude_antes:
-        Amplitude_db = np.array(Amplitude_Direta(Sinal_VLF, Taxa_de_amostragem, Rs, Fc))
-        salvar_bin(Amplitude_db, diretorio_de_pre_processamento, f"Amplitude_db_Direta_{Data}")
-        FE_DK2, FI_DK2, *_ = main_DMSK(Sinal_VLF, Sinal_GPS, Taxa_de_amostragem, Rs, Fc)
+def abrir_leitor(caminho, papel=None, canais=Numero_de_canais, formato=Formato_captura):
+    """
+    Leitor da captura inteira ou da janela UT configurada (com seek). Com
+    'papel' ("VLF"/"GPS") e Canais_captura definido, retorna o canal
+    correspondente da captura intercalada.
+    """
+    if Janela_UT is None:
+        leitor = LeitorSinalVLF(caminho, Fs=Taxa_de_amostragem, formato=formato,
+                                canais=canais)
     else:
-        FE_DK2, FI_DK2, _, _, Amp = main_DMSK(Sinal_VLF, Sinal_GPS, Taxa_de_amostragem, Rs, Fc)
-        Amp = np.array(Amp)
-
-elif simulacao:
+        leitor = abrir_janela(caminho, Taxa_de_amostragem, Bloco_inicio, Bloco_fim,
+                              margem_s=Margem_aquecimento, formato=formato,
+                              canais=canais)
+    if papel is not None and Canais_captura is not None:
+        leitor = leitor.canal(Canais_captura[papel])
+    return leitor
+
+# Cache de estágios: chave = captura + parâmetros + versão do código
+cache = (CacheEstagios(os.path.join(diretorio_de_pre_processamento, 'Cache'),
+                       Orcamento_cache_GB * 1e9) if Usar_cache else None)
+
+def entradas_leitor(leitor):
+    """Identidade da captura e do trecho lido (canal, janela)."""
+    if leitor is None:
+        return None
+    return {
+        "captura": identidade_captura(leitor.caminho, Checksum_captura),
+        "canal": leitor.indice_canal,
+        "bloco_inicial": leitor.bloco_inicial,
+        "total_blocos": leitor.total_blocos,
+        "aquecimento": leitor.blocos_aquecimento,
+        "tamanho_bloco": leitor.tamanho_bloco,
+    }
+
+def abrir_banda_base(Sinal_VLF):
+    """
+    Leitor do arquivo IQ em banda base de Fc com a mesma janela de
+    Sinal_VLF. O arquivo é gerado da captura inteira na primeira vez.
+    """
+    completo = LeitorSinalVLF(Sinal_VLF.caminho, Fs=Sinal_VLF.Fs, formato=Formato_captura,
+                              canais=Numero_de_canais, canal=Sinal_VLF.indice_canal)
+    caminho_iq = garantir_banda_base(completo, Fc, Decimacao_banda_base)
+    return LeitorBandaBase(caminho_iq, bloco_inicial=Sinal_VLF.bloco_inicial,
+                           total_blocos=Sinal_VLF.total_blocos,
+                           blocos_aquecimento=Sinal_VLF.blocos_aquecimento)
+
+def demodular(Sinal_VLF, Sinal_GPS, qualidade):
+    """
+    Demodulação com cache: se a mesma captura já foi demodulada com os mesmos
+    parâmetros e código, só os produtos (pós-processamento) são refeitos.
+    """
+    chave = chave_estagio(
+        "demodulacao",
+        vlf=entradas_leitor(Sinal_VLF), gps=entradas_leitor(Sinal_GPS),
+        Fs=Taxa_de_amostragem, Fc=Fc, Rs=Rs, Teste=Teste, sincronismo=Sincronismo_continuo,
+        banda_base=Decimacao_banda_base if Usar_banda_base else None,
+        qualidade=qualidade["flags"] if qualidade is not None else None,
+        codigo=versao_codigo(Demodulador_MSK2, main_Demodulador_MSK2, Banda_Base,
+                             Leitor_Sinal, Qualidade)
+    )
+
+    dados = cache.obter(chave) if cache is not None else None
+    if dados is not None:
+        print(f"[CACHE] Reaproveitado: {chave}")
+        reproduzir_blocos(dados, produtos)
+        return dados["fase_blocos"], dados["FI"]
+
+    if Usar_banda_base:
+        Sinal_VLF = abrir_banda_base(Sinal_VLF)
+
+    gravador = GravadorBlocos(produtos)
+    FE, FI, *_ = main_DMSK(Sinal_VLF, Sinal_GPS, Taxa_de_amostragem, Rs, Fc, Teste=Teste,
+                           produtos=gravador, qualidade=qualidade,
+                           sincronismo=Sincronismo_continuo, lote=Lote_demodulacao)
+    if cache is not None:
+        # FE é a concatenação de 'fase_blocos' do gravador: não é gravada de novo
+        cache.guardar(chave, FI=FI, **gravador.arrays())
+    return FE, FI
+
+def amplitude_direta(Sinal_VLF, qualidade):
+    """Amplitude_Direta com cache."""
+    chave = chave_estagio(
+        "amplitude_direta",
+        vlf=entradas_leitor(Sinal_VLF), Fs=Taxa_de_amostragem, Fc=Fc, Rs=Rs,
+        qualidade=qualidade["flags"] if qualidade is not None else None,
+        codigo=versao_codigo(Amplitude, Leitor_Sinal, Qualidade)
+    )
+    dados = em_cache(cache, chave, lambda: {"Amplitude_db": np.array(
+        Amplitude_Direta(Sinal_VLF, Taxa_de_amostragem, Rs, Fc, qualidade=qualidade))})
+    return dados["Amplitude_db"]
+
+def gerar_GPS_simulado():
+    """
+    Gera (ou reaproveita) o GPS simulado com jitter alternado, do tamanho da
+    captura, e retorna o caminho do arquivo float32.
+    """
     from Modulos.Simulacao_GPS import gerar_pulso_GPS
     from tqdm import tqdm
 
@@ -209,127 +338,316 @@ elif simulacao:
     sinal_base = gerar_pulso_GPS(Taxa_de_amostragem, JITTER_RANGE_MS, 2*Taxa_de_amostragem)
     sinal_base2 = gerar_pulso_GPS(Taxa_de_amostragem, 0, 2*Taxa_de_amostragem)
 
-    len_GPS = int(np.fromfile(caminho_do_arquivo_VLF, dtype=np.float32).size)
+    len_GPS = LeitorSinalVLF(caminho_do_arquivo_VLF, Fs=Taxa_de_amostragem,
+                             formato=Formato_captura, canais=Numero_de_canais).total_amostras
     total_segundos = len_GPS // Taxa_de_amostragem
     caminho_simulado = os.path.join(diretorio_de_entrada, f"GPS_simulado{Data}.bin")
 
-    # Gera GPS simulado com jitter alternado
-    with open(caminho_simulado, "wb") as f:
-        C = 1
-        for _ in tqdm(range(total_segundos), desc="Gerando sinal GPS simulado"):
-            (sinal_base if C == 1 else sinal_base2).tofile(f)
-            C *= -1
-
-    caminho_do_arquivo_GPS = caminho_simulado
-    Sinal_VLF = LeitorSinalVLF(caminho_do_arquivo_VLF, Fs=Taxa_de_amostragem)
-    Sinal_GPS = LeitorSinalVLF(caminho_do_arquivo_GPS, Fs=Taxa_de_amostragem)
-
-    if Amplitude_antes:
-        Amplitude_db = np.array(Amplitude_Direta(Sinal_VLF, Taxa_de_amostragem, Rs, Fc))
-        salvar_bin(Amplitude_db, diretorio_de_pre_processamento, f"Amplitude_db_Direta_{Data}")
-        FE_DK2, FI_DK2, *_ = main_DMSK(Sinal_VLF, Sinal_GPS, Taxa_de_amostragem, Rs, Fc)
-    else:
-        FE_DK2, FI_DK2, _, _, Amp = main_DMSK(Sinal_VLF, Sinal_GPS, Taxa_de_amostragem, Rs, Fc)
-        Amp = np.array(Amp)
-
-# Conversão final dos arrays
-FE_DK2 = np.array(FE_DK2)
-FI_DK2 = np.array(FI_DK2)
-
-salvar_bin(FE_DK2, diretorio_de_pre_processamento, f"FE_DK2_{Data}")
-salvar_bin(FI_DK2, diretorio_de_pre_processamento, f"FI_DK2_{Data}")
-
-# =============================================================================
-# PÓS-PROCESSAMENTO DA AMPLITUDE
-# =============================================================================
-
-if not Amplitude_antes:
-    epsilon = 1e-6
-    P_referencia = 5e-6
-    suavisacao = 60
-    Amplitude = np.zeros(len(Amp) // (Rb * suavisacao))
+    # Reaproveita o arquivo já gerado, mantendo a identidade da entrada para
+    # o cache de estágios
+    tamanho_esperado = total_segundos * sinal_base.nbytes
+    if not os.path.exists(caminho_simulado) or os.path.getsize(caminho_simulado) != tamanho_esperado:
+        with open(caminho_simulado, "wb") as f:
+            C = 1
+            for _ in tqdm(range(total_segundos), desc="Gerando sinal GPS simulado"):
+                (sinal_base if C == 1 else sinal_base2).tofile(f)
+                C *= -1
+    return caminho_simulado
 
-    for k, i in enumerate(range(Rb * suavisacao, len(Amp), Rb * suavisacao)):
-        Amplitude[k] = max(np.sqrt(np.mean(Amp[i - Rb * suavisacao:i]**2)), epsilon)
-
-    Amplitude_db = -20 * np.log10(Amplitude / P_referencia)
-    salvar_bin(Amplitude_db, diretorio_de_pre_processamento, f"Amplitude_db_{Data}")
-
-# =============================================================================
-# CÁLCULO E SALVAMENTO DA FASE
 # =============================================================================
-
-fase = (-np.unwrap(FE_DK2) * 360) / Fc
-salvar_bin(fase, diretorio_de_resultados, f"Diferença_de_fase_{Data}")
-
+# QUICKLOOK ESPECTRAL
 # =============================================================================
-# GRAVAÇÃO EM FITS E TXT (BACKUP)
-# =============================================================================
-
-# Amplitude
-
-salvar_fits(
-    caminho=diretorio_de_resultados,
-    nome_arquivo=f"Amplitude_db_{Data}",
-    dados={"FASE_D": Amplitude_db},
-    header1=header_amp
-)
 
-# Fase
-
-salvar_fits(
-    caminho=diretorio_de_resultados,
-    nome_arquivo=f"Diferença_de_fase_{Data}",
-    dados={"AMP_D": fase},
-    header1=header_fase
-)
-
-tempo_UT_Amp = np.linspace(0 + H, 24 + H, len(Amplitude_db))
-tempo_UT_Fase = np.linspace(0 + H, 24 + H, len(fase))
-
-dados_amp = np.column_stack((tempo_UT_Amp, Amplitude_db))
-salvar_txt(dados_amp, diretorio_de_resultados, f"Amplitude_db_{Data}", colunas=["Tempo_UT", "Amplitude_dB"])
-
-dados_fase = np.column_stack((tempo_UT_Fase, fase))
-salvar_txt(dados_fase, diretorio_de_resultados, f"Fase_{Data}", colunas=["Tempo_UT", "Fase_deg"])
+if Quicklook_espectral:
+    # Passagem própria pela captura, antes de confiar na demodulação
+    Sinal_quicklook = abrir_leitor(caminho_do_arquivo_VLF, papel="VLF")
+    espectrograma = main_espectrograma(Sinal_quicklook, Taxa_de_amostragem, Portadoras_quicklook,
+                                       largura_banda=2 * Rs, tempo_inicial_UT=Hora_inicial_janela_UT)
+    diretorio_quicklook = os.path.join(diretorio_de_resultados, 'Quicklook')
+    espectrograma.salvar(diretorio_quicklook, f"Espectrograma_{Data}")
+    espectrograma.plotar(diretorio_quicklook, f"Espectrograma_{Data}", titulo=f"Espectrograma VLF {Data}")
 
 # =============================================================================
-# PLOTAGEM FINAL (AMPLITUDE, FASE, COMPARAÇÃO)
+# MODO DE VARREDURA DE PARÂMETROS
 # =============================================================================
 
-# Amplitude
-ColA = '#0093dcff'
-plt.figure(figsize=(10, 6))
-plt.plot(tempo_UT_Amp[1:], abs(Amplitude_db[1:]), ColA)
-plt.title(f'Amplitude {Data}')
-plt.ylabel("Amplitude [dB]")
-plt.xlabel("Horas UT")
-plt.grid()
-plt.show()
-
-# Fase
-ColF = '#dd9300ff'
-plt.figure(figsize=(10, 6))
-plt.plot(tempo_UT_Fase, fase, ColF)
-plt.title(f'Fase {Data}')
-plt.ylabel("Fase [°]")
-plt.xlabel("Horas UT")
-plt.grid()
-plt.show()
-
-# Amplitude vs Fase
-fig, ax1 = plt.subplots()
-ax1.plot(tempo_UT_Amp[1:], abs(Amplitude_db[1:]), ColA, label=f'Amplitude {Data}')
-ax1.set_ylabel('Amplitude [dB]', color=ColA)
-ax1.tick_params(axis='y', labelcolor=ColA)
-
-ax2 = ax1.twinx()
-ax2.plot(tempo_UT_Fase, fase, ColF, label=f'Fase {Data}')
-ax2.set_ylabel('Fase [°]', color=ColF)
-ax2.tick_params(axis='y', labelcolor=ColF)
-
-ax1.set_xlabel("Horas UT")
-plt.title(f'Comparação do sinal VLF Amplitude Vs Fase - Dia {Data}')
-ax1.legend(ax1.get_lines() + ax2.get_lines(), [l.get_label() for l in ax1.get_lines() + ax2.get_lines()])
-plt.show()
+if Varredura is not None:
+    # A varredura demodula bloco a bloco na taxa da captura (o lote não muda
+    # o resultado); banda base e sincronismo contínuo não têm equivalente
+    if Usar_banda_base or Sincronismo_continuo:
+        raise ValueError("Varredura não suporta Usar_banda_base nem Sincronismo_continuo; "
+                         "desative-os para comparar com uma execução normal")
+
+    # Leitura, passa-alta e correção do GPS compartilhadas entre as configurações
+    configuracoes = grade_parametros(**{"Fc": Fc, "Rs": Rs, "Teste": Teste, **Varredura})
+    Sinal_VLF = abrir_leitor(caminho_do_arquivo_VLF, papel="VLF")
+    qualidade = carregar_ou_calcular_qualidade(Sinal_VLF) if Usar_qualidade else None
+    # GPS escolhido na mesma ordem do processamento normal
+    if simulacao:
+        Sinal_GPS = abrir_leitor(gerar_GPS_simulado(), canais=1, formato="float32")
+    elif GPS_intercalado:
+        Sinal_GPS = Sinal_VLF.canal(Canais_captura["GPS"])
+    elif Nome_do_arquivo_GPS is not None:
+        Sinal_GPS = abrir_leitor(os.path.join(diretorio_de_entrada, Nome_do_arquivo_GPS), canais=1)
+    else:
+        Sinal_GPS = None
+
+    registros_varredura = {rotulo_configuracao(c): [] for c in configuracoes}
+    produtos_varredura = {
+        rotulo: ProdutosOnline(c["Fc"], blocos_por_registro=suavisacao,
+                               tempo_inicial_UT=Hora_inicial_janela_UT, epsilon=epsilon,
+                               P_referencia=P_referencia,
+                               ao_registrar=registros_varredura[rotulo].append)
+        for rotulo, c in zip(registros_varredura, configuracoes)
+    }
+    resultados = main_varredura(Sinal_VLF, Sinal_GPS, Taxa_de_amostragem, configuracoes,
+                                produtos=produtos_varredura, qualidade=qualidade)
+
+    diretorio_varredura = os.path.join(diretorio_de_resultados, f'Varredura {Data}')
+    for rotulo, resultado in resultados.items():
+        regs = registros_varredura[rotulo]
+        Amplitude_cfg = np.array([r.amplitude_db for r in regs])
+        fase_cfg = np.concatenate([r.fase for r in regs]) if regs else np.zeros(0)
+
+        salvar_bin(resultado["FE"], diretorio_de_pre_processamento, f"FE_{rotulo}_{Data}")
+        salvar_bin(resultado["FI"], diretorio_de_pre_processamento, f"FI_{rotulo}_{Data}")
+        salvar_bin(Amplitude_cfg, diretorio_varredura, f"Amplitude_db_{rotulo}_{Data}")
+        salvar_bin(fase_cfg, diretorio_varredura, f"Diferença_de_fase_{rotulo}_{Data}")
+        salvar_txt_rapido(
+            np.column_stack(([r.tempo_UT for r in regs], Amplitude_cfg, [r.flags for r in regs])),
+            diretorio_varredura, f"Amplitude_db_{rotulo}_{Data}",
+            colunas=["Tempo_UT", "Amplitude_dB", "Flags"],
+            fmt=[formato_tempo_UT(suavisacao), Formato_valores_txt, "%d"], compactar=Compactar_txt
+        )
+
+    print(f"[VARREDURA] {len(resultados)} configurações gravadas em {diretorio_varredura}")
+
+else:
+    # =========================================================================
+    # PROCESSAMENTO NORMAL (uma configuração)
+    # =========================================================================
+
+    # Registros de fase/amplitude emitidos durante a demodulação
+    registros = []
+    publicador = (PublicadorProdutos(Endereco_publicacao)
+                  if Publicar_produtos and not Modo_rapido else None)
+
+    def ao_registrar(registro):
+        """Guarda o registro e o repassa aos assinantes, se houver publicador."""
+        registros.append(registro)
+        if publicador is not None:
+            publicador.publicar(registro)
+
+    produtos = ProdutosOnline(
+        Fc,
+        blocos_por_registro=suavisacao,
+        tempo_inicial_UT=Hora_inicial_janela_UT,
+        epsilon=epsilon,
+        P_referencia=P_referencia,
+        ao_registrar=ao_registrar
+    )
+
+    if Modo_rapido:
+        # Modo leve: estimador de portadora por bloco, sem demodulação completa
+        Sinal_VLF = abrir_leitor(caminho_do_arquivo_VLF, papel="VLF")
+        Amplitude_db, fase = main_Estimador(Sinal_VLF, Taxa_de_amostragem, Rs, Fc,
+                                            epsilon=epsilon, P_referencia=P_referencia)
+        salvar_bin(Amplitude_db, diretorio_de_pre_processamento, f"Amplitude_db_{Sufixo_saida}{Data}")
+
+    elif Nome_do_arquivo_GPS is None and not GPS_intercalado and not simulacao:
+        Sinal_VLF = abrir_leitor(caminho_do_arquivo_VLF, papel="VLF")
+        qualidade = carregar_ou_calcular_qualidade(Sinal_VLF) if Usar_qualidade else None
+
+        if Amplitude_antes:
+            Amplitude_db = amplitude_direta(Sinal_VLF, qualidade)
+            salvar_bin(Amplitude_db, diretorio_de_pre_processamento, f"Amplitude_db_Direta_{Data}")
+        FE_DK2, FI_DK2 = demodular(Sinal_VLF, None, qualidade)
+
+    elif (Nome_do_arquivo_GPS is not None or GPS_intercalado) and not simulacao:
+        Sinal_VLF = abrir_leitor(caminho_do_arquivo_VLF, papel="VLF")
+        qualidade = carregar_ou_calcular_qualidade(Sinal_VLF) if Usar_qualidade else None
+        if GPS_intercalado:
+            # Mesmo arquivo, outro canal: visão com passo sobre o mesmo mapeamento
+            Sinal_GPS = Sinal_VLF.canal(Canais_captura["GPS"])
+        else:
+            caminho_do_arquivo_GPS = os.path.join(diretorio_de_entrada, Nome_do_arquivo_GPS)
+            Sinal_GPS = abrir_leitor(caminho_do_arquivo_GPS, canais=1)
+
+        if Amplitude_antes:
+            Amplitude_db = amplitude_direta(Sinal_VLF, qualidade)
+            salvar_bin(Amplitude_db, diretorio_de_pre_processamento, f"Amplitude_db_Direta_{Data}")
+        FE_DK2, FI_DK2 = demodular(Sinal_VLF, Sinal_GPS, qualidade)
+
+    elif simulacao:
+        caminho_do_arquivo_GPS = gerar_GPS_simulado()
+        Sinal_VLF = abrir_leitor(caminho_do_arquivo_VLF, papel="VLF")
+        qualidade = carregar_ou_calcular_qualidade(Sinal_VLF) if Usar_qualidade else None
+        Sinal_GPS = abrir_leitor(caminho_do_arquivo_GPS, canais=1, formato="float32")  # gerado aqui
+
+        if Amplitude_antes:
+            Amplitude_db = amplitude_direta(Sinal_VLF, qualidade)
+            salvar_bin(Amplitude_db, diretorio_de_pre_processamento, f"Amplitude_db_Direta_{Data}")
+        FE_DK2, FI_DK2 = demodular(Sinal_VLF, Sinal_GPS, qualidade)
+
+    if not Modo_rapido:
+        # Conversão final dos arrays
+        FE_DK2 = np.array(FE_DK2)
+        FI_DK2 = np.array(FI_DK2)
+
+        salvar_bin(FE_DK2, diretorio_de_pre_processamento, f"FE_DK2_{Data}")
+        salvar_bin(FI_DK2, diretorio_de_pre_processamento, f"FI_DK2_{Data}")
+
+    if publicador is not None:
+        publicador.fechar()  # envia os registros pendentes e encerra os assinantes
+
+    # =========================================================================
+    # PÓS-PROCESSAMENTO DA AMPLITUDE
+    # =========================================================================
+
+    if not Amplitude_antes and not Modo_rapido:
+        # RMS por intervalo já calculado pelos registros online
+        Amplitude_db = np.array([r.amplitude_db for r in registros])
+        salvar_bin(Amplitude_db, diretorio_de_pre_processamento, f"Amplitude_db_{Sufixo_saida}{Data}")
+
+        # Flags de qualidade de cada registro (OU dos blocos do intervalo)
+        Flags_qualidade = np.array([r.flags for r in registros])
+        salvar_bin(Flags_qualidade, diretorio_de_resultados, f"Qualidade_{Data}")
+
+    # =========================================================================
+    # CÁLCULO E SALVAMENTO DA FASE
+    # =========================================================================
+
+    # Fase já desembrulhada incrementalmente pelos registros online
+    if not Modo_rapido:
+        fase = np.concatenate([r.fase for r in registros])
+    salvar_bin(fase, diretorio_de_resultados, f"Diferença_de_fase_{Sufixo_saida}{Data}")
+
+    # =========================================================================
+    # GRAVAÇÃO EM FITS E TXT (BACKUP)
+    # =========================================================================
+
+    # Amplitude
+
+    salvar_fits(
+        caminho=diretorio_de_resultados,
+        nome_arquivo=f"Amplitude_db_{Sufixo_saida}{Data}",
+        dados={"FASE_D": Amplitude_db},
+        header1=header_amp
+    )
+
+    # Fase
+
+    salvar_fits(
+        caminho=diretorio_de_resultados,
+        nome_arquivo=f"Diferença_de_fase_{Sufixo_saida}{Data}",
+        dados={"AMP_D": fase},
+        header1=header_fase
+    )
+
+    if Modo_rapido:
+        # Um valor por bloco de 1 s
+        tempo_UT_Amp = Hora_inicial_janela_UT + np.arange(len(Amplitude_db)) / 3600
+        tempo_UT_Fase = tempo_UT_Amp
+    else:
+        if Amplitude_antes:
+            tempo_UT_Amp = Hora_inicial_janela_UT + np.arange(len(Amplitude_db)) / 3600
+        else:
+            tempo_UT_Amp = np.array([r.tempo_UT for r in registros])
+        # Amostras de fase distribuídas dentro do intervalo de cada registro
+        # (o último pode ser parcial: termina no último bloco processado)
+        fim_registros = [r.tempo_UT for r in registros[1:]]
+        fim_registros.append(Hora_inicial_janela_UT + produtos.blocos * produtos.duracao_bloco / 3600)
+        tempo_UT_Fase = np.concatenate([
+            np.linspace(r.tempo_UT, fim, len(r.fase), endpoint=False)
+            for r, fim in zip(registros, fim_registros)
+        ])
+
+    # Casas decimais do tempo de acordo com o passo de cada tabela
+    passo_Amp_s = 1 if (Modo_rapido or Amplitude_antes) else suavisacao
+    fmt_tempo_Amp = formato_tempo_UT(passo_Amp_s)
+
+    if not Amplitude_antes and not Modo_rapido:
+        dados_amp = np.column_stack((tempo_UT_Amp, Amplitude_db, Flags_qualidade))
+        salvar_txt_rapido(dados_amp, diretorio_de_resultados, f"Amplitude_db_{Sufixo_saida}{Data}",
+                          colunas=["Tempo_UT", "Amplitude_dB", "Flags"],
+                          fmt=[fmt_tempo_Amp, Formato_valores_txt, "%d"], compactar=Compactar_txt)
+    else:
+        dados_amp = np.column_stack((tempo_UT_Amp, Amplitude_db))
+        salvar_txt_rapido(dados_amp, diretorio_de_resultados, f"Amplitude_db_{Sufixo_saida}{Data}",
+                          colunas=["Tempo_UT", "Amplitude_dB"],
+                          fmt=[fmt_tempo_Amp, Formato_valores_txt], compactar=Compactar_txt)
+
+    if Cadencia_fase_txt_s:
+        # Tempos = início da janela + índice do intervalo
+        tempo_UT_Fase_txt, fase_txt = decimar_serie(tempo_UT_Fase, fase, Cadencia_fase_txt_s,
+                                                    Hora_inicial_janela_UT)
+        passo_Fase_s = Cadencia_fase_txt_s
+    else:
+        tempo_UT_Fase_txt, fase_txt = tempo_UT_Fase, fase
+        passo_Fase_s = 1 if Modo_rapido else 1 / Rb
+
+    dados_fase = np.column_stack((tempo_UT_Fase_txt, fase_txt))
+    salvar_txt_rapido(dados_fase, diretorio_de_resultados, f"Fase_{Sufixo_saida}{Data}",
+                      colunas=["Tempo_UT", "Fase_deg"],
+                      fmt=[formato_tempo_UT(passo_Fase_s), Formato_valores_txt], compactar=Compactar_txt)
+
+    # =========================================================================
+    # ARQUIVO MULTIDIAS E DIFERENÇA PARA A CURVA DE DIA CALMO (QDC)
+    # =========================================================================
+
+    if Usar_arquivo_multidias:
+        arquivo = ArquivoMultidias(
+            os.path.join(diretorio_de_resultados, 'Arquivo multidias',
+                         f"{station}_{Fc}_{Metodo_arquivo}"),
+            resolucao_s=Resolucao_arquivo_s,
+            janela_dias=Janela_QDC_dias
+        )
+        # Janela UT: mescla só os pontos cobertos, sem apagar o dia já arquivado
+        arquivo.adicionar_dia(Data, tempo_UT_Amp, Amplitude_db, tempo_UT_Fase, fase,
+                              parcial=Janela_UT is not None)
+
+        # Dia menos QDC (NaN enquanto não houver dias anteriores no arquivo)
+        Amplitude_menos_QDC, Fase_menos_QDC = arquivo.diferenca_qdc(Data)
+        salvar_bin(Amplitude_menos_QDC, diretorio_de_resultados, f"Amplitude_menos_QDC_{Sufixo_saida}{Data}")
+        salvar_bin(Fase_menos_QDC, diretorio_de_resultados, f"Fase_menos_QDC_{Sufixo_saida}{Data}")
+
+    # =========================================================================
+    # PLOTAGEM FINAL (AMPLITUDE, FASE, COMPARAÇÃO)
+    # =========================================================================
+
+    # Amplitude
+    ColA = '#0093dcff'
+    plt.figure(figsize=(10, 6))
+    plt.plot(tempo_UT_Amp[1:], abs(Amplitude_db[1:]), ColA)
+    plt.title(f'Amplitude {Data}')
+    plt.ylabel("Amplitude [dB]")
+    plt.xlabel("Horas UT")
+    plt.grid()
+    plt.show()
+
+    # Fase
+    ColF = '#dd9300ff'
+    plt.figure(figsize=(10, 6))
+    plt.plot(tempo_UT_Fase, fase, ColF)
+    plt.title(f'Fase {Data}')
+    plt.ylabel("Fase [°]")
+    plt.xlabel("Horas UT")
+    plt.grid()
+    plt.show()
+
+    # Amplitude vs Fase
+    fig, ax1 = plt.subplots()
+    ax1.plot(tempo_UT_Amp[1:], abs(Amplitude_db[1:]), ColA, label=f'Amplitude {Data}')
+    ax1.set_ylabel('Amplitude [dB]', color=ColA)
+    ax1.tick_params(axis='y', labelcolor=ColA)
+
+    ax2 = ax1.twinx()
+    ax2.plot(tempo_UT_Fase, fase, ColF, label=f'Fase {Data}')
+    ax2.set_ylabel('Fase [°]', color=ColF)
+    ax2.tick_params(axis='y', labelcolor=ColF)
+
+    ax1.set_xlabel("Horas UT")
+    plt.title(f'Comparação do sinal VLF Amplitude Vs Fase - Dia {Data}')
+    ax1.legend(ax1.get_lines() + ax2.get_lines(), [l.get_label() for l in ax1.get_lines() + ax2.get_lines()])
+    plt.show()
 
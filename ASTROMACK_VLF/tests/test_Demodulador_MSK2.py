@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Sincronismo de símbolo contínuo: com o relógio da placa de som fora do
+nominal, o atraso da grade deve acompanhar a deriva dos símbolos.
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Modulos.Demodulador_MSK2 import SincronizadorSimbolos, demodular_MSK2
+
+
+Fs = 48000
+Rs = 200
+Fc = 21400
+N_bit = Fs // (2 * Rs)
+
+
+def _msk(segundos, ppm, atraso_inicial=0, fase=0.3, seed=0):
+    """
+    MSK com o relógio de símbolos deslocado de 'ppm' e os símbolos
+    atrasados de 'atraso_inicial' amostras (portadora corrigida pelo GPS).
+    """
+    rng = np.random.default_rng(seed)
+    Rb = 2 * Rs / (1 + ppm * 1e-6)
+    t = np.arange(segundos * Fs) / Fs
+    t_simbolo = t - atraso_inicial / Fs + 1 / Rb
+    bits = rng.choice([-1, 1], int(np.ceil(segundos * Rb)) + 3)
+    k = (t_simbolo * Rb).astype(int)
+    fracao = t_simbolo * Rb - k
+    theta = np.concatenate(([0], np.cumsum(bits) * np.pi / 2))[k] + bits[k] * fracao * np.pi / 2
+    return np.cos(2 * np.pi * Fc * t + theta + fase) + rng.normal(0, 0.3, t.size)
+
+
+@pytest.mark.parametrize("atraso_inicial", [0, N_bit // 2, 3 * N_bit // 2])
+@pytest.mark.parametrize("ppm", [100, -100])
+def test_atraso_acompanha_deriva_do_relogio(ppm, atraso_inicial):
+    segundos = 20
+    sinal = _msk(segundos, ppm, atraso_inicial)
+    sincronizador = SincronizadorSimbolos(N_bit)
+    atrasos = []
+    for b in range(segundos):
+        demodular_MSK2(sinal[b * Fs:(b + 1) * Fs], None, Fs, Rs, Fc, sincronizador=sincronizador)
+        atrasos.append(sincronizador.atraso)
+
+    # Deriva esperada: 2*Rs símbolos por segundo, cada um ppm*1e-6*N_bit mais longo
+    esperada = 2 * Rs * N_bit * ppm * 1e-6
+    passos = np.diff(atrasos[8:])  # depois da aquisição (até N_bit/8 por bloco)
+    assert abs(np.mean(passos) - esperada) < 0.1 * abs(esperada)
+    assert np.all(np.sign(passos) == np.sign(esperada))
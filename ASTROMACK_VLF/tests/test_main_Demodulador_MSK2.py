@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Demodulação em lote (K, N) deve ser idêntica à demodulação bloco a bloco,
+inclusive quando a pré-varredura de qualidade descarta blocos.
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Modulos.Leitor_Sinal import LeitorSinalVLF
+from Modulos.Produtos_Online import ProdutosOnline
+from Modulos.Qualidade import DTYPE_QUALIDADE, FLAG_NAN
+from Modulos.main_Demodulador_MSK2 import main_DMSK
+
+
+Fs = 48000
+Rs = 200
+Fc = 21400
+
+
+def _captura(caminho, segundos=12):
+    rng = np.random.default_rng(0)
+    t = np.arange(segundos * Fs) / Fs
+    sinal = 1e-3 * np.cos(2 * np.pi * Fc * t + 0.5) + rng.normal(0, 2e-4, t.size)
+    sinal.astype(np.float32).tofile(caminho)
+
+
+def _demodular(caminho, qualidade, lote):
+    registros = []
+    produtos = ProdutosOnline(Fc, blocos_por_registro=3, ao_registrar=registros.append)
+    FE, FI, *_ = main_DMSK(LeitorSinalVLF(caminho, Fs=Fs), None, Fs, Rs, Fc,
+                           produtos=produtos, qualidade=qualidade, lote=lote)
+    return FE, FI, registros
+
+
+def test_lote_com_bloco_descartado_igual_bloco_a_bloco(tmp_path):
+    caminho = str(tmp_path / "captura.mat")
+    _captura(caminho)
+    qualidade = np.zeros(12, dtype=DTYPE_QUALIDADE)
+    qualidade["flags"][[5, 10]] = FLAG_NAN  # no meio de um lote de 4 (blocos bons pendentes)
+
+    FE_1, FI_1, registros_1 = _demodular(caminho, qualidade, lote=1)
+    FE_4, FI_4, registros_4 = _demodular(caminho, qualidade, lote=4)
+
+    np.testing.assert_array_equal(FE_1, FE_4)
+    np.testing.assert_array_equal(FI_1, FI_4)
+    assert len(registros_1) == len(registros_4) == 4
+    for r1, r4 in zip(registros_1, registros_4):
+        assert r1.tempo_UT == r4.tempo_UT
+        assert r1.flags == r4.flags
+        np.testing.assert_array_equal(r1.amplitude_db, r4.amplitude_db)
+        np.testing.assert_array_equal(r1.fase, r4.fase)
+
+    # Os blocos descartados caem no 2º e no 4º registro
+    assert [r.flags for r in registros_4] == [0, FLAG_NAN, 0, FLAG_NAN]